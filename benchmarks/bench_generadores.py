@@ -0,0 +1,51 @@
+# Benchmark de los generadores de terreno (ver generadores.py).
+#
+# Mide, para cada generador y tamaño, el tiempo de rellenar el terreno y el
+# de generar_mapa completo (regiones, portal y entidades).
+#
+#   python benchmarks/bench_generadores.py
+#   python benchmarks/bench_generadores.py --tamanos 500 2000 --backend numpy
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generadores import GENERADORES  # noqa: E402
+from mapa import Mapa  # noqa: E402
+
+
+def medir(generador, tamano, backend, repeticiones):
+    terreno = completo = float('inf')
+    for semilla in range(repeticiones):
+        mapa = Mapa(tamano, tamano, seed=semilla, backend=backend, generador=generador)
+        inicio = time.perf_counter()
+        mapa._generar_terreno(0.6)
+        terreno = min(terreno, time.perf_counter() - inicio)
+
+        mapa = Mapa(tamano, tamano, seed=semilla, backend=backend, generador=generador)
+        inicio = time.perf_counter()
+        mapa.generar_mapa()
+        completo = min(completo, time.perf_counter() - inicio)
+    return terreno, completo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los generadores de terreno')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--backend', choices=('lista', 'numpy'), default='numpy')
+    parser.add_argument('--generadores', nargs='+', default=sorted(GENERADORES))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'generador':<10} {'tamaño':>8} {'terreno (s)':>12} {'generar_mapa (s)':>17}")
+    for generador in args.generadores:
+        for tamano in args.tamanos:
+            terreno, completo = medir(generador, tamano, args.backend, args.repeticiones)
+            print(f"{generador:<10} {tamano:>8} {terreno:>12.4f} {completo:>17.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Benchmark del tiempo de importación de los módulos.
+#
+# Importa cada módulo en un intérprete nuevo (como un proceso de trabajo que
+# sólo genera mapas o simula) y mide el tiempo de la importación. Indica
+# también si la importación arrastró a pygame: sólo la ventana (juego.py,
+# main.py) debería hacerlo.
+#
+#   python benchmarks/bench_importacion.py
+#   python benchmarks/bench_importacion.py --modulos mapa juego --repeticiones 10
+
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = ['config', 'terreno', 'entidades', 'mapa', 'generadores', 'generacion_paralela', 'mundo',
+           'precarga', 'partida', 'simulacion', 'lote', 'juego']
+
+# Se ejecuta en el intérprete hijo: tiempo de importar el módulo y si cargó pygame
+_SONDA = """
+import sys, time
+inicio = time.perf_counter()
+import {modulo}
+print(time.perf_counter() - inicio, 'pygame' in sys.modules)
+"""
+
+
+def medir(modulo, repeticiones):
+    mejor = float('inf')
+    con_pygame = False
+    entorno = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', _SONDA.format(modulo=modulo)], cwd=RAIZ, env=entorno,
+                                capture_output=True, text=True, check=True).stdout.split()
+        mejor = min(mejor, float(salida[-2]))
+        con_pygame = salida[-1] == 'True'
+    return mejor, con_pygame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del tiempo de importación')
+    parser.add_argument('--modulos', nargs='+', default=MODULOS)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'módulo':<20} {'importar (ms)':>14} {'pygame':>7}")
+    for modulo in args.modulos:
+        tiempo, con_pygame = medir(modulo, args.repeticiones)
+        print(f"{modulo:<20} {tiempo * 1000:>14.1f} {'sí' if con_pygame else 'no':>7}")
+
+
+if __name__ == '__main__':
+    main()
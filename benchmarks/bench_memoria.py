@@ -0,0 +1,122 @@
+# Benchmark de la memoria que ocupan las entidades.
+#
+# Crea N enemigos y N cofres con cada representación y mide con tracemalloc
+# lo que ocupan (objetos, listas y enteros incluidos):
+#
+#   - dict: clases normales con __dict__ por instancia y el contenido del
+#     cofre como cadena (las clases de entidades.py antes de usar __slots__)
+#   - slots: las clases actuales de entidades.py
+#   - empaquetado: EnemigosEmpaquetados / CofresEmpaquetados (serializacion.py)
+#   - numpy: una columna por atributo, como TablaEnemigos y LoteJuegos
+#
+#   python benchmarks/bench_memoria.py
+#   python benchmarks/bench_memoria.py --cantidades 1000 1000000
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entidades import Enemigo, Cofre, CONTENIDOS  # noqa: E402
+from serializacion import EnemigosEmpaquetados, CofresEmpaquetados  # noqa: E402
+from terreno import np  # noqa: E402
+
+LADO_MAPA = 3000   # posiciones como las de un nivel grande
+
+
+class EnemigoDict:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.vida = 50
+        self.vision = 5
+        self.cadencia = 2
+        self.ultimo_movimiento = 0
+        self.ultimo_dx = 0
+        self.ultimo_dy = 0
+
+
+class CofreDict:
+    def __init__(self, x, y, contenido, valor):
+        self.x = x
+        self.y = y
+        self.contenido = contenido
+        self.valor = valor
+        self.abierto = False
+
+
+def _posiciones(n):
+    rng = random.Random(n)
+    return [(rng.randrange(LADO_MAPA), rng.randrange(LADO_MAPA)) for _ in range(n)]
+
+
+def crear_dict(posiciones):
+    return ([EnemigoDict(x, y) for x, y in posiciones],
+            [CofreDict(x, y, CONTENIDOS[i % 3], i % 50) for i, (x, y) in enumerate(posiciones)])
+
+
+def crear_slots(posiciones):
+    return ([Enemigo(x, y) for x, y in posiciones],
+            [Cofre(x, y, codigo=i % 3, valor=i % 50) for i, (x, y) in enumerate(posiciones)])
+
+
+def crear_empaquetado(posiciones):
+    # Se empaquetan por tandas para no tener todos los objetos vivos a la vez
+    enemigos = EnemigosEmpaquetados()
+    cofres = CofresEmpaquetados()
+    for inicio in range(0, len(posiciones), 1024):
+        tanda = posiciones[inicio:inicio + 1024]
+        enemigos.extend(Enemigo(x, y) for x, y in tanda)
+        cofres.extend(Cofre(x, y, codigo=i % 3, valor=i % 50) for i, (x, y) in enumerate(tanda, inicio))
+    return enemigos, cofres
+
+
+def crear_numpy(posiciones):
+    n = len(posiciones)
+    xy = np.array(posiciones, dtype=np.int32).reshape(n, 2)
+    enemigos = {'x': xy[:, 0].copy(), 'y': xy[:, 1].copy(), 'vida': np.full(n, 50, np.int32),
+                'vision': np.full(n, 5, np.int32), 'cadencia': np.full(n, 2, np.uint8),
+                'ultimo_movimiento': np.zeros(n, np.int32), 'ultimo_dx': np.zeros(n, np.int8),
+                'ultimo_dy': np.zeros(n, np.int8)}
+    cofres = {'x': xy[:, 0].copy(), 'y': xy[:, 1].copy(), 'codigo': (np.arange(n) % 3).astype(np.uint8),
+              'valor': (np.arange(n) % 50).astype(np.int32), 'abierto': np.zeros(n, np.bool_)}
+    return enemigos, cofres
+
+
+REPRESENTACIONES = {'dict': crear_dict, 'slots': crear_slots, 'empaquetado': crear_empaquetado}
+if np is not None:
+    REPRESENTACIONES['numpy'] = crear_numpy
+
+
+def medir(crear, posiciones):
+    """Bytes que siguen ocupados tras crear las entidades (sin contar `posiciones`)."""
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    entidades = crear(posiciones)
+    total = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del entidades
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memoria de las entidades')
+    parser.add_argument('--cantidades', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--representaciones', nargs='+', default=list(REPRESENTACIONES),
+                        choices=list(REPRESENTACIONES))
+    args = parser.parse_args()
+
+    print(f"{'entidades':>10} {'representación':<14} {'total (MB)':>11} {'bytes/entidad':>14}")
+    for n in args.cantidades:
+        posiciones = _posiciones(n)
+        for nombre in args.representaciones:
+            total = medir(REPRESENTACIONES[nombre], posiciones)
+            # Cada entidad es un enemigo más un cofre
+            print(f"{n:>10} {nombre:<14} {total / 2 ** 20:>11.2f} {total / (2 * n):>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
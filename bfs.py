@@ -0,0 +1,202 @@
+# Motor BFS sobre índices planos.
+#
+# Las celdas se numeran idx = x * columnas + y. El motor reserva una vez
+# los búferes int32 de distancias y de cola y los reutiliza en cada
+# búsqueda, así que explorar un mapa no crea tuplas, sets ni dicts.
+# La cola queda ordenada por distancia: orden[:alcanzados] son las celdas
+# alcanzadas de la más cercana a la más lejana.
+#
+# También incluye el etiquetado de regiones conexas y el corredor de
+# mínimos muros que usa la generación para coser regiones.
+
+import re
+from array import array
+from collections import deque
+
+_RACHA = re.compile(b'[^\x00]+')  # celdas transitables consecutivas
+
+
+class MotorBFS:
+    def __init__(self, filas, columnas):
+        self.filas = filas
+        self.columnas = columnas
+        n = filas * columnas
+        self._sin_visitar = array('i', [-1]) * n
+        self.dist = array('i', self._sin_visitar)   # -1 = no alcanzable
+        self.orden = array('i', [0]) * n            # cola / celdas en orden BFS
+        self.alcanzados = 0
+        self._padre = None                          # sólo para corredor_minimo
+
+    def indice(self, x, y):
+        return x * self.columnas + y
+
+    def celda(self, idx):
+        return divmod(idx, self.columnas)
+
+    def explorar(self, paso, inicios):
+        """BFS desde uno o varios índices de inicio.
+
+        `paso` es una secuencia plana (bytes/bytearray) con 1 en las celdas
+        transitables. Los inicios no transitables se ignoran. Rellena
+        self.dist y self.orden y devuelve la cantidad de celdas alcanzadas.
+        """
+        columnas = self.columnas
+        total = self.filas * columnas
+        ultima_fila = total - columnas
+        dist = self.dist
+        cola = self.orden
+        dist[:] = self._sin_visitar
+
+        fin = 0
+        for idx in inicios:
+            if paso[idx] and dist[idx] < 0:
+                dist[idx] = 0
+                cola[fin] = idx
+                fin += 1
+
+        cabeza = 0
+        while cabeza < fin:
+            idx = cola[cabeza]
+            cabeza += 1
+            d = dist[idx] + 1
+            y = idx % columnas
+            if idx >= columnas:
+                v = idx - columnas
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if idx < ultima_fila:
+                v = idx + columnas
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if y > 0:
+                v = idx - 1
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if y < columnas - 1:
+                v = idx + 1
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+
+        self.alcanzados = fin
+        return fin
+
+    def corredor_minimo(self, paso, inicio, es_destino):
+        """Camino desde `inicio` hasta la celda más barata que cumpla
+        es_destino(idx), cruzando la menor cantidad posible de muros.
+
+        Es un BFS 0-1: pisar suelo cuesta 0 y abrir un muro cuesta 1, así que
+        toda la región del inicio se recorre gratis. Devuelve la lista de
+        índices del camino (sin el inicio), o None si ninguna celda es destino.
+        Deja en self.dist el coste en muros (no distancias).
+        """
+        columnas = self.columnas
+        total = self.filas * columnas
+        coste = self.dist
+        coste[:] = self._sin_visitar
+        if self._padre is None:
+            self._padre = array('i', [0]) * total
+        padre = self._padre
+        cerrado = bytearray(total)
+
+        coste[inicio] = 0
+        cola = deque((inicio,))
+        while cola:
+            idx = cola.popleft()
+            if cerrado[idx]:
+                continue
+            cerrado[idx] = 1
+            if es_destino(idx):
+                camino = []
+                while idx != inicio:
+                    camino.append(idx)
+                    idx = padre[idx]
+                camino.reverse()
+                return camino
+            c = coste[idx]
+            y = idx % columnas
+            vecinos = []
+            if idx >= columnas:
+                vecinos.append(idx - columnas)
+            if idx < total - columnas:
+                vecinos.append(idx + columnas)
+            if y > 0:
+                vecinos.append(idx - 1)
+            if y < columnas - 1:
+                vecinos.append(idx + 1)
+            for v in vecinos:
+                if cerrado[v]:
+                    continue
+                muro = 0 if paso[v] else 1
+                nuevo = c + muro
+                if coste[v] < 0 or nuevo < coste[v]:
+                    coste[v] = nuevo
+                    padre[v] = idx
+                    if muro:
+                        cola.append(v)
+                    else:
+                        cola.appendleft(v)
+        return None
+
+
+def etiquetar_componentes(paso, filas, columnas):
+    """Etiqueta en una pasada las regiones conexas (4-vecindad) de suelo.
+
+    Trabaja por rachas horizontales de celdas transitables y une con
+    union-find las rachas que se solapan con las de la fila anterior.
+    Devuelve (etiquetas, tamanos): etiquetas[idx] es el número de región
+    (0..k-1) o -1 en los muros, y tamanos[k] la cantidad de celdas.
+    """
+    paso = bytes(paso)
+    padre = []
+    rachas = []       # (inicio, fin) en índices planos, por id de racha
+    anteriores = []   # (col_inicio, col_fin, id) de la fila anterior
+
+    def raiz(r):
+        while padre[r] != r:
+            padre[r] = padre[padre[r]]
+            r = padre[r]
+        return r
+
+    for x in range(filas):
+        base = x * columnas
+        actuales = []
+        for m in _RACHA.finditer(paso, base, base + columnas):
+            rid = len(padre)
+            padre.append(rid)
+            rachas.append((m.start(), m.end()))
+            actuales.append((m.start() - base, m.end() - base, rid))
+        # Unir rachas solapadas con la fila anterior (dos punteros)
+        i = j = 0
+        while i < len(anteriores) and j < len(actuales):
+            a_ini, a_fin, a_id = anteriores[i]
+            b_ini, b_fin, b_id = actuales[j]
+            if a_ini < b_fin and b_ini < a_fin:
+                ra, rb = raiz(a_id), raiz(b_id)
+                if ra != rb:
+                    padre[max(ra, rb)] = min(ra, rb)
+            if a_fin < b_fin:
+                i += 1
+            else:
+                j += 1
+        anteriores = actuales
+
+    etiquetas = array('i', [-1]) * (filas * columnas)
+    tamanos = []
+    numero = {}
+    for rid, (ini, fin) in enumerate(rachas):
+        r = raiz(rid)
+        k = numero.get(r)
+        if k is None:
+            k = numero[r] = len(tamanos)
+            tamanos.append(0)
+        tamanos[k] += fin - ini
+        etiquetas[ini:fin] = array('i', [k]) * (fin - ini)
+    return etiquetas, tamanos
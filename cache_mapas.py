@@ -0,0 +1,122 @@
+# Caché de mapas generados, por semilla.
+#
+# Como cada Mapa usa su propio RNG, (filas, columnas, semilla, generador,
+# backend) determina por completo el mapa generado. La caché guarda el
+# registro comprimido del nivel (paquete_niveles.nivel_a_bytes) en dos
+# niveles: una LRU acotada en memoria y, opcionalmente, un directorio en
+# disco. Cada consulta devuelve un Mapa nuevo, así que jugar uno no altera
+# la copia cacheada.
+#
+# La usan a la vez el hilo de precarga y el principal (precarga.py), así que
+# la LRU va protegida con un cerrojo. Generar y leer de disco se hace fuera
+# de él: si dos hilos piden el mismo mapa a la vez, lo generan los dos y
+# sale el mismo.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from config import MAP_CACHE_SIZE, MAP_CACHE_DIR, TERRAIN_BACKEND, TERRAIN_GENERATOR
+from mapa import Mapa
+from paquete_niveles import VERSION as VERSION_NIVEL, nivel_a_bytes, nivel_desde_bytes
+
+
+class CacheMapas:
+    def __init__(self, capacidad=MAP_CACHE_SIZE, directorio=MAP_CACHE_DIR):
+        self.capacidad = capacidad
+        self.directorio = directorio
+        if directorio is not None:
+            os.makedirs(directorio, exist_ok=True)
+        self._memoria = OrderedDict()  # clave -> registro comprimido
+        self._cerrojo = threading.Lock()  # protege _memoria y los contadores
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(filas, columnas, semilla, generador, backend):
+        # Con la versión del registro, los ficheros de un formato anterior no se leen
+        return (filas, columnas, semilla, generador, backend, VERSION_NIVEL)
+
+    def _ruta(self, clave):
+        nombre = hashlib.sha1(repr(clave).encode()).hexdigest()
+        return os.path.join(self.directorio, nombre + '.nivel')
+
+    def obtener(self, filas, columnas, semilla, generador=None, backend=None):
+        """Mapa generado para esos parámetros: de la caché si ya se generó."""
+        generador = generador or TERRAIN_GENERATOR
+        backend = backend or TERRAIN_BACKEND
+        if semilla is None:
+            # Sin semilla el mapa es irrepetible: no tiene sentido cachearlo
+            mapa = Mapa(filas, columnas, backend=backend, generador=generador)
+            mapa.generar_mapa()
+            return mapa
+
+        clave = self.clave(filas, columnas, semilla, generador, backend)
+        with self._cerrojo:
+            registro = self._memoria.get(clave)
+            if registro is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+        if registro is not None:
+            return nivel_desde_bytes(registro, backend)
+
+        registro = self._leer_disco(clave)
+        if registro is not None:
+            with self._cerrojo:
+                self.aciertos_disco += 1
+            self._guardar_memoria(clave, registro)
+            return nivel_desde_bytes(registro, backend)
+
+        with self._cerrojo:
+            self.fallos += 1
+        mapa = Mapa(filas, columnas, seed=semilla, backend=backend, generador=generador)
+        mapa.generar_mapa()
+        registro = nivel_a_bytes(mapa)
+        self._guardar_memoria(clave, registro)
+        self._escribir_disco(clave, registro)
+        return mapa
+
+    def vaciar_memoria(self):
+        with self._cerrojo:
+            self._memoria.clear()
+
+    def _guardar_memoria(self, clave, registro):
+        if self.capacidad <= 0:
+            return
+        with self._cerrojo:
+            self._memoria[clave] = registro
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.capacidad:
+                self._memoria.popitem(last=False)
+
+    def _leer_disco(self, clave):
+        if self.directorio is None:
+            return None
+        try:
+            with open(self._ruta(clave), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _escribir_disco(self, clave, registro):
+        if self.directorio is None:
+            return
+        # Escribir aparte y renombrar: otro proceso (u otro hilo) nunca ve un fichero a medias
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(registro)
+        os.replace(temporal, ruta)
+
+
+_cache = None
+
+
+def cache_por_defecto():
+    """Caché compartida del proceso, configurada con MAP_CACHE_SIZE / MAP_CACHE_DIR."""
+    global _cache
+    if _cache is None:
+        _cache = CacheMapas()
+    return _cache
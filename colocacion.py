@@ -0,0 +1,71 @@
+# Colocación de entidades con separación mínima (muestreo tipo Poisson-disk).
+#
+# Los candidatos se barajan una vez y se aceptan en orden si no tienen otro
+# punto del mismo grupo a menos de la distancia mínima. La comprobación usa
+# una rejilla de fondo con celdas del tamaño del radio: sólo se miran las
+# 3x3 celdas vecinas, así que colocar k entidades entre n candidatos cuesta
+# O(n + k) en lugar de comparar todas contra todas.
+
+import random
+
+
+class RejillaSeparacion:
+    """Rejilla de aceleración para consultar si un punto respeta `radio`."""
+
+    def __init__(self, filas, columnas, radio):
+        self.radio = radio
+        self.r2 = radio * radio
+        self.lado = max(1, radio)
+        self.filas_rejilla = filas // self.lado + 1
+        self.columnas_rejilla = columnas // self.lado + 1
+        self.celdas = [None] * (self.filas_rejilla * self.columnas_rejilla)
+
+    def libre(self, x, y):
+        """True si no hay ningún punto a distancia euclídea < radio de (x, y)."""
+        if self.radio <= 0:
+            return True
+        ci = x // self.lado
+        cj = y // self.lado
+        for i in range(max(0, ci - 1), min(self.filas_rejilla, ci + 2)):
+            base = i * self.columnas_rejilla
+            for j in range(max(0, cj - 1), min(self.columnas_rejilla, cj + 2)):
+                puntos = self.celdas[base + j]
+                if puntos:
+                    for px, py in puntos:
+                        if (px - x) * (px - x) + (py - y) * (py - y) < self.r2:
+                            return False
+        return True
+
+    def agregar(self, x, y):
+        k = (x // self.lado) * self.columnas_rejilla + y // self.lado
+        if self.celdas[k] is None:
+            self.celdas[k] = []
+        self.celdas[k].append((x, y))
+
+
+def muestrear_separadas(candidatos, cantidad, rejilla, columnas, rng=random):
+    """Elige hasta `cantidad` índices planos de `candidatos` separados según
+    la rejilla (que queda con los puntos elegidos). Puede devolver menos si
+    la separación no deja sitio para todos.
+    """
+    orden = list(candidatos)
+    rng.shuffle(orden)
+    elegidos = []
+    for idx in orden:
+        if len(elegidos) == cantidad:
+            break
+        x, y = divmod(idx, columnas)
+        if rejilla.libre(x, y):
+            rejilla.agregar(x, y)
+            elegidos.append(idx)
+    return elegidos
+
+
+def completar(elegidos, reserva, cantidad, rng=random):
+    """Completa `elegidos` hasta `cantidad` con celdas de `reserva` sin separación."""
+    faltan = cantidad - len(elegidos)
+    if faltan <= 0:
+        return elegidos
+    usados = set(elegidos)
+    resto = [idx for idx in reserva if idx not in usados]
+    return elegidos + rng.sample(resto, min(faltan, len(resto)))
@@ -1,8 +1,8 @@
 # Constantes y configuración global
-
-import pygame
-
-pygame.init()
+#
+# Sólo datos: no importa pygame. La ventana (juego.py) inicializa los
+# módulos de pygame que usa, así que la lógica, la generación y los
+# procesos de trabajo no pagan ese arranque.
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -26,3 +26,63 @@ PURPLE = (128, 0, 128)
 ENEMY_DAMAGE = 25           # Daño al jugador por colisión si no usa item
 MONEY_MIN = 10              # Valor mínimo de dinero en un cofre
 MONEY_MAX = 50              # Valor máximo de dinero en un cofre
+ENEMY_MOVE_EVERY = 2        # Movimientos del jugador entre dos pasos de un enemigo (por defecto)
+
+# Persecución de los enemigos: 'flujo' (bajan por un campo de distancias al
+# jugador compartido, ver flujo.py) o 'voraz' (paso directo hacia el jugador)
+ENEMY_PATHFINDING = 'flujo'
+ENEMY_FLOW_RADIUS = 20      # Radio de la ventana del campo de distancias
+# Con al menos tantos enemigos despiertos se mueven a la vez sobre arrays de NumPy
+# (ver tabla_enemigos.py); None para moverlos siempre uno a uno
+ENEMY_TABLE_MIN = 256
+
+# Separación mínima al colocar entidades (en casillas)
+ENEMY_PLAYER_MIN_DIST = 4   # Pasos BFS entre el jugador y cualquier enemigo
+ENEMY_ENEMY_MIN_DIST = 2    # Distancia euclídea entre enemigos
+CHEST_CHEST_MIN_DIST = 3    # Distancia euclídea entre cofres
+
+# --- Representación del terreno ---
+# 'lista': lista de listas de caracteres (por defecto)
+# 'numpy': grilla uint8 con tabla de paso (requiere NumPy; recomendado en mapas grandes)
+TERRAIN_BACKEND = 'lista'
+
+# --- Campo de visión ---
+# 'circulo': círculo euclídeo que atraviesa muros (clásico)
+# 'sombras': línea de visión con sombras simétricas (los muros tapan)
+FOV_MODE = 'circulo'
+
+# --- Generador de terreno ---
+# 'ruido' (clásico), 'cuevas' (autómata celular, requiere NumPy) o 'bsp' (salas y pasillos)
+TERRAIN_GENERATOR = 'ruido'
+# Generador por nivel concreto, p. ej. {5: 'cuevas', 10: 'bsp'}; el resto usa TERRAIN_GENERATOR
+LEVEL_GENERATORS = {}
+
+# --- Generación en paralelo por teselas (Mapa(paralelo=True), ver generacion_paralela.py) ---
+PARALLEL_TILE_SIZE = 512    # Lado de cada tesela en celdas
+PARALLEL_WORKERS = None     # Procesos (None = uno por núcleo)
+
+# --- Mundo por chunks (ver mundo.py) ---
+CHUNKED_WORLD = False       # True: cada nivel es un mundo casi ilimitado generado por chunks
+CHUNK_SIZE = 64             # Lado de cada chunk en celdas
+CHUNK_CACHE = 64            # Chunks en memoria; el resto se guarda en disco (LRU)
+CHUNK_WORLD_CHUNKS = 4096   # Chunks por lado del mundo
+CHUNK_PORTAL_DISTANCE = 3   # Distancia en chunks del inicio al portal
+
+# --- Precarga del siguiente nivel (ver precarga.py) ---
+# 'hilo', 'proceso' o None (generar al cruzar el portal)
+LEVEL_PREFETCH = 'hilo'
+
+# --- Semillas y caché de mapas (ver cache_mapas.py) ---
+LEVEL_SEED = None           # Semilla base de la partida (p. ej. reto diario); None = aleatoria
+MAP_CACHE_SIZE = 32         # Mapas en la caché en memoria (LRU)
+MAP_CACHE_DIR = None        # Directorio de la caché en disco (None = sólo memoria)
+
+# --- Partidas guardadas (ver partida.py) ---
+SAVE_PATH = 'partida.sav'   # Fichero de la partida (F5 guarda, F9 carga)
+
+# --- Deshacer turnos (ver historial.py) ---
+HISTORY_TURNS = 1000        # Turnos que se pueden deshacer con U (0 = sin historial)
+
+# --- Repeticiones (ver repeticion.py) ---
+REPLAY_CHECKSUM_EVERY = 50  # Acciones entre sumas de comprobación del estado
+REPLAY_SPEED = 10           # Acciones por segundo al reproducir en tiempo real
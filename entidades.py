@@ -1,12 +1,30 @@
 # Clases: Personaje, Enemigo, Cofre
+#
+# Las tres usan __slots__ (sin __dict__ por instancia): en los niveles
+# grandes y en las simulaciones por lotes hay decenas de miles. Para
+# guardarlas en bloque sin un objeto por entidad, ver los contenedores
+# empaquetados de serializacion.py.
 
 
 import random
-from config import MONEY_MIN, MONEY_MAX
+from config import MONEY_MIN, MONEY_MAX, ENEMY_MOVE_EVERY
+from terreno import celda_transitable
+
+# Códigos de objeto: contenido de los cofres e inventario del jugador
+OBJETO_ARMADURA = 0
+OBJETO_ESPADA = 1
+OBJETO_DINERO = 2
+CONTENIDOS = ('armadura', 'espada', 'dinero')   # código -> nombre
+
+# Orden en que se prueban las vecinas al bajar por el campo de distancias
+DIRECCIONES = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
 
 
 class Personaje:
+    __slots__ = ('x', 'y', 'movimientos', 'corazones_totales', 'corazones_llenos', 'armaduras', 'espadas',
+                 'puntuacion')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -27,11 +45,7 @@ class Personaje:
         """Mueve al jugador si la celda es transitable."""
         nuevo_x = self.x + dx
         nuevo_y = self.y + dy
-        filas = len(base_matriz)
-        columnas = len(base_matriz[0])
-        if not (0 <= nuevo_x < filas and 0 <= nuevo_y < columnas):
-            return False
-        if base_matriz[nuevo_x][nuevo_y] in ('.', 'S'):
+        if celda_transitable(base_matriz, nuevo_x, nuevo_y):
             self.x = nuevo_x
             self.y = nuevo_y
             self.movimientos += 1
@@ -55,48 +69,108 @@ class Personaje:
 
 
 class Enemigo:
+    __slots__ = ('x', 'y', 'vida', 'vision', 'cadencia', 'ultimo_movimiento', 'ultimo_dx', 'ultimo_dy')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
         self.vida = 50
         self.vision = 5
+        # Velocidad: da un paso cada `cadencia` movimientos del jugador
+        self.cadencia = ENEMY_MOVE_EVERY
         self.ultimo_movimiento = 0
         # Dirección del último paso (para poder empujar en sentido contrario)
         self.ultimo_dx = 0
         self.ultimo_dy = 0
 
-    def mover_hacia_jugador(self, jugador, base_matriz, movimiento_actual):
-        # Se mueve cada 2 movimientos del jugador
-        if movimiento_actual - self.ultimo_movimiento < 2:
+    def mover_hacia_jugador(self, jugador, base_matriz, movimiento_actual, linea_de_vision=None,
+                            campo_flujo=None):
+        """Da un paso hacia el jugador si lo ve.
+
+        Sin `linea_de_vision` basta con que el jugador esté en el cuadrado de
+        lado 2 * vision; con ella (p. ej. Mapa.linea_de_vision) además los
+        muros deben dejar verlo. Sin `campo_flujo` el paso es el directo por
+        el eje más largo; con él (flujo.CampoFlujo situado en el jugador) el
+        enemigo baja por el campo de distancias y rodea los muros.
+        """
+        # Se mueve cada `cadencia` movimientos del jugador
+        if movimiento_actual - self.ultimo_movimiento < self.cadencia:
             return False
         dist_x = jugador.x - self.x
         dist_y = jugador.y - self.y
         if abs(dist_x) <= self.vision and abs(dist_y) <= self.vision:
+            if linea_de_vision is not None and not linea_de_vision(self.x, self.y, jugador.x, jugador.y, self.vision):
+                return False
             dx, dy = 0, 0
             if abs(dist_x) > abs(dist_y):
                 dx = 1 if dist_x > 0 else -1
             else:
                 dy = 1 if dist_y > 0 else -1
+            if campo_flujo is not None:
+                return self._bajar_por_campo(campo_flujo, dx, dy, movimiento_actual)
             nuevo_x = self.x + dx
             nuevo_y = self.y + dy
-            filas = len(base_matriz)
-            columnas = len(base_matriz[0])
-            if 0 <= nuevo_x < filas and 0 <= nuevo_y < columnas:
-                if base_matriz[nuevo_x][nuevo_y] in ('.', 'S'):
-                    self.x = nuevo_x
-                    self.y = nuevo_y
-                    self.ultimo_movimiento = movimiento_actual
-                    self.ultimo_dx = dx
-                    self.ultimo_dy = dy
-                    return True
+            if celda_transitable(base_matriz, nuevo_x, nuevo_y):
+                self.x = nuevo_x
+                self.y = nuevo_y
+                self.ultimo_movimiento = movimiento_actual
+                self.ultimo_dx = dx
+                self.ultimo_dy = dy
+                return True
+        return False
+
+    def turno_despertar(self, jugador, turno):
+        """Primer turno desde `turno` en que podría moverse (para planificador.py).
+
+        Tiene que haber pasado su cadencia y el jugador tiene que entrar en
+        su cuadrado de visión; como el jugador avanza una casilla por turno,
+        antes no puede llegar.
+        """
+        lejos = max(abs(jugador.x - self.x), abs(jugador.y - self.y)) - self.vision
+        return max(turno, self.ultimo_movimiento + self.cadencia, jugador.movimientos + lejos)
+
+    def _bajar_por_campo(self, campo_flujo, dx, dy, movimiento_actual):
+        """Paso a una vecina más cercana al jugador; se prueba antes (dx, dy)."""
+        d = campo_flujo.distancia(self.x, self.y)
+        if d <= 0:
+            return False  # en la casilla del jugador o sin camino dentro de la ventana
+        for pdx, pdy in ((dx, dy),) + DIRECCIONES:
+            if campo_flujo.distancia(self.x + pdx, self.y + pdy, d - 1) == d - 1:
+                self.x += pdx
+                self.y += pdy
+                self.ultimo_movimiento = movimiento_actual
+                self.ultimo_dx = pdx
+                self.ultimo_dy = pdy
+                return True
         return False
 
+
+
 class Cofre:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'codigo', 'valor', 'abierto')
+
+    def __init__(self, x, y, rng=random, codigo=None, valor=0):
+        """`rng` es el generador aleatorio del mapa (por defecto, el global).
+
+        Con `codigo` (y `valor`) el contenido es ese en lugar de sortearse.
+        """
         self.x = x
         self.y = y
-        # Armadura / Espada / Dinero
-        self.contenido = random.choice(['armadura', 'espada', 'dinero'])
-        # Valor solo aplica para dinero
-        self.valor = random.randint(MONEY_MIN, MONEY_MAX) if self.contenido == 'dinero' else 0
         self.abierto = False
+        if codigo is not None:
+            self.codigo = codigo
+            self.valor = valor
+            return
+        # Armadura / Espada / Dinero, como código OBJETO_*
+        self.codigo = rng.randrange(len(CONTENIDOS))
+        # Valor solo aplica para dinero
+        self.valor = rng.randint(MONEY_MIN, MONEY_MAX) if self.codigo == OBJETO_DINERO else 0
+
+    @property
+    def contenido(self):
+        """Nombre del contenido ('armadura', 'espada' o 'dinero')."""
+        return CONTENIDOS[self.codigo]
+
+    @contenido.setter
+    def contenido(self, nombre):
+        self.codigo = CONTENIDOS.index(nombre)
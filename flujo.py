@@ -0,0 +1,170 @@
+# Campo de distancias al jugador compartido por todos los enemigos.
+#
+# En lugar de que cada enemigo busque su propio camino, se hace un único
+# BFS desde el jugador y cada enemigo baja por el campo: da el paso a la
+# vecina con distancia una menor. El coste por turno es el de un BFS, sin
+# importar cuántos enemigos haya.
+#
+# El BFS se limita a una ventana de (2 * radio + 1)^2 celdas centrada en el
+# jugador (los enemigos sólo persiguen desde su radio de visión), con
+# búferes reservados una vez. La máscara de paso de la ventana se guarda:
+# cuando el jugador avanza sólo se consulta el terreno de las filas o
+# columnas que entran en la ventana (una si avanzó una casilla), y nunca el
+# de las celdas fuera del mapa. Todo se calcula de forma perezosa: el BFS
+# avanza sólo lo que hace falta para responder a los enemigos que preguntan
+# (que están cerca del jugador) y se reutiliza hasta que el jugador se mueve
+# o cambia el terreno (invalidar()).
+
+from array import array
+
+
+class CampoFlujo:
+    def __init__(self, es_opaca, filas, columnas, radio):
+        self._es_opaca = es_opaca
+        self.filas = filas
+        self.columnas = columnas
+        self.radio = radio
+        self.lado = lado = 2 * radio + 1
+        self._sin_visitar = array('i', [-1]) * (lado * lado)
+        self.dist = array('i', self._sin_visitar)
+        self._cola = array('i', [0]) * (lado * lado)
+        self._paso = None        # bytearray lado x lado de la ventana actual
+        self._origen = None      # (x, y) del jugador
+        self._esquina = None     # (x, y) de la celda [0, 0] de la ventana
+        self._calculado = False  # BFS empezado desde el origen actual
+        self._cabeza = self._fin = 0
+
+    def invalidar(self):
+        """El terreno cambió: hay que volver a leer la máscara de paso."""
+        self._paso = None
+        self._calculado = False
+
+    def fijar_origen(self, x, y):
+        """Sitúa el campo en el jugador; el BFS se rehace al consultarlo."""
+        if (x, y) != self._origen:
+            self._origen = (x, y)
+            self._calculado = False
+
+    def distancia(self, x, y, hasta=None):
+        """Pasos desde el jugador hasta (x, y) dentro de la ventana, o -1.
+
+        El BFS avanza sólo hasta alcanzar (x, y); con `hasta` tampoco pasa
+        de esa distancia (-1 si la celda está más lejos).
+        """
+        if not self._calculado:
+            self._empezar()
+        lx = x - self._esquina[0]
+        ly = y - self._esquina[1]
+        if 0 <= lx < self.lado and 0 <= ly < self.lado:
+            idx = lx * self.lado + ly
+            d = self.dist[idx]
+            if d < 0 and self._cabeza < self._fin:
+                self._avanzar(idx, hasta)
+                d = self.dist[idx]
+            return d
+        return -1
+
+    def ventana(self):
+        """(x, y) de la esquina de la ventana y sus distancias (array 'i', fila a fila)."""
+        if not self._calculado:
+            self._empezar()
+        self._avanzar(None, None)
+        return self._esquina[0], self._esquina[1], self.dist
+
+    # ===================== Internos =====================
+    def _tramo_paso(self, x, y0, y1):
+        """Máscara de paso de las celdas (x, y0..y1-1); fuera del mapa, muro."""
+        tramo = bytearray(y1 - y0)
+        if 0 <= x < self.filas:
+            es_opaca = self._es_opaca
+            for y in range(max(y0, 0), min(y1, self.columnas)):
+                if not es_opaca(x, y):
+                    tramo[y - y0] = 1
+        return tramo
+
+    def _mover_ventana(self, ex, ey):
+        """Rehace la máscara de paso para la ventana con esquina (ex, ey).
+
+        Se copia la parte que ya estaba en la ventana anterior y sólo se
+        consulta el terreno de las filas y columnas que entran.
+        """
+        lado = self.lado
+        anterior = self._paso
+        if anterior is not None and (ex, ey) == self._esquina:
+            return
+        paso = bytearray(lado * lado)
+        dx = dy = lado
+        if anterior is not None:
+            dx, dy = ex - self._esquina[0], ey - self._esquina[1]
+        # Columnas [a, b) de la ventana nueva que ya estaban en la anterior
+        a, b = max(0, -dy), min(lado, lado - dy)
+        for i in range(max(0, -ex), min(lado, self.filas - ex)):
+            x = ex + i
+            previa = i + dx
+            if a >= b or not 0 <= previa < lado:
+                paso[i * lado:(i + 1) * lado] = self._tramo_paso(x, ey, ey + lado)
+                continue
+            paso[i * lado + a:i * lado + b] = anterior[previa * lado + a + dy:previa * lado + b + dy]
+            if a:
+                paso[i * lado:i * lado + a] = self._tramo_paso(x, ey, ey + a)
+            if b < lado:
+                paso[i * lado + b:(i + 1) * lado] = self._tramo_paso(x, ey + b, ey + lado)
+        self._paso = paso
+
+    def _empezar(self):
+        x, y = self._origen
+        ex, ey = x - self.radio, y - self.radio
+        self._mover_ventana(ex, ey)
+        self._esquina = (ex, ey)
+        self._calculado = True
+        self.dist[:] = self._sin_visitar
+        inicio = self.radio * self.lado + self.radio
+        self.dist[inicio] = 0
+        self._cola[0] = inicio
+        self._cabeza = 0
+        self._fin = 1
+
+    def _avanzar(self, objetivo, hasta):
+        """Sigue el BFS hasta visitar `objetivo` (None: hasta el final) sin pasar de `hasta`."""
+        lado = self.lado
+        paso = self._paso
+        dist = self.dist
+        cola = self._cola
+        cabeza = self._cabeza
+        fin = self._fin
+        ultima_fila = lado * (lado - 1)
+        while cabeza < fin:
+            if objetivo is not None and dist[objetivo] >= 0:
+                break
+            idx = cola[cabeza]
+            d = dist[idx] + 1
+            if hasta is not None and d > hasta:
+                break
+            cabeza += 1
+            y = idx % lado
+            if idx >= lado:
+                v = idx - lado
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if idx < ultima_fila:
+                v = idx + lado
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if y > 0:
+                v = idx - 1
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+            if y < lado - 1:
+                v = idx + 1
+                if paso[v] and dist[v] < 0:
+                    dist[v] = d
+                    cola[fin] = v
+                    fin += 1
+        self._cabeza = cabeza
+        self._fin = fin
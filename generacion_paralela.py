@@ -0,0 +1,131 @@
+# Generación en paralelo de un mapa enorme por teselas.
+#
+# El terreno se parte en teselas de tam_tile x tam_tile que se generan en un
+# ProcessPoolExecutor. Cada proceso escribe su tesela directamente en un
+# bloque de memoria compartida (uint8, el formato de GrillaTerreno), así que
+# no se serializan listas entre procesos: sólo viajan los parámetros.
+#
+# Cada tesela usa una semilla derivada de (semilla, fila, columna), de modo
+# que el resultado no depende del número de procesos ni del orden. Para que
+# el mapa quede conectado, cada tesela abre un "puerto" en el punto medio de
+# cada borde compartido y lo une a su mayor región con el corredor de menos
+# muros; los puertos de las dos teselas vecinas quedan enfrentados.
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from bfs import MotorBFS, etiquetar_componentes
+from generadores import obtener_generador
+from terreno import GrillaTerreno, SUELO, np
+
+
+class Tesela:
+    """Lo mínimo que necesita un generador: filas, columnas y base_matriz."""
+
+    def __init__(self, base_matriz, filas, columnas):
+        self.filas = filas
+        self.columnas = columnas
+        self.base_matriz = base_matriz
+
+
+def teselas(filas, columnas, tam_tile):
+    """Rectángulos (x0, y0, x1, y1) que cubren el mapa."""
+    return [(x0, y0, min(filas, x0 + tam_tile), min(columnas, y0 + tam_tile))
+            for x0 in range(0, filas, tam_tile)
+            for y0 in range(0, columnas, tam_tile)]
+
+
+def puertos_tesela(rect, filas, columnas):
+    """Celdas (locales) del borde de la tesela enfrentadas a cada vecina."""
+    x0, y0, x1, y1 = rect
+    alto, ancho = x1 - x0, y1 - y0
+    puertos = []
+    if x0 > 0:
+        puertos.append((0, ancho // 2))
+    if x1 < filas:
+        puertos.append((alto - 1, ancho // 2))
+    if y0 > 0:
+        puertos.append((alto // 2, 0))
+    if y1 < columnas:
+        puertos.append((alto // 2, ancho - 1))
+    return puertos
+
+
+def conectar_puertos(paso, alto, ancho, puertos):
+    """Une cada puerto (x, y local) con la mayor región de la tesela.
+
+    Abre el corredor de menos muros desde cada puerto; actualiza `paso` y
+    devuelve los índices planos de las celdas que hay que convertir en suelo.
+    """
+    etiquetas, tamanos = etiquetar_componentes(paso, alto, ancho)
+    abiertas = []
+    if tamanos:
+        mayor = max(range(len(tamanos)), key=tamanos.__getitem__)
+
+        def en_mayor(idx):
+            return etiquetas[idx] == mayor
+    else:
+        # Tesela sin suelo: todos los puertos se unen en el centro
+        centro = (alto // 2) * ancho + ancho // 2
+        paso[centro] = 1
+        abiertas.append(centro)
+
+        def en_mayor(idx):
+            return idx == centro
+
+    motor = MotorBFS(alto, ancho)
+    for px, py in puertos:
+        inicio = px * ancho + py
+        camino = motor.corredor_minimo(paso, inicio, en_mayor) or []
+        for idx in [inicio] + camino:
+            if not paso[idx]:
+                paso[idx] = 1
+                abiertas.append(idx)
+    return abiertas
+
+
+def _generar_tesela(nombre_memoria, filas, columnas, rect, prob_suelo, semilla, generador):
+    """Trabajo de un proceso: genera la tesela y la cose a sus puertos."""
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    try:
+        completo = np.ndarray((filas, columnas), dtype=np.uint8, buffer=memoria.buf)
+        x0, y0, x1, y1 = rect
+        vista = completo[x0:x1, y0:y1]
+        tesela = Tesela(GrillaTerreno.desde_codigos(vista), x1 - x0, y1 - y0)
+        obtener_generador(generador)(tesela, prob_suelo, random.Random(f"{semilla}:{x0}:{y0}"))
+
+        puertos = puertos_tesela(rect, filas, columnas)
+        if puertos:
+            paso = bytearray(tesela.base_matriz.mascara_transitable().tobytes())
+            for idx in conectar_puertos(paso, tesela.filas, tesela.columnas, puertos):
+                vista[divmod(idx, tesela.columnas)] = SUELO
+        del completo, vista, tesela
+        return rect
+    finally:
+        memoria.close()
+
+
+def generar_terreno_paralelo(filas, columnas, prob_suelo, semilla, generador='ruido',
+                             tam_tile=512, procesos=None):
+    """Genera el terreno de un mapa filas x columnas por teselas en paralelo.
+
+    Devuelve una GrillaTerreno (requiere NumPy). El resultado sólo depende de
+    la semilla, el generador y tam_tile.
+    """
+    if np is None:
+        raise ImportError("La generación en paralelo requiere tener NumPy instalado")
+    memoria = shared_memory.SharedMemory(create=True, size=max(1, filas * columnas))
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            trabajos = [pool.submit(_generar_tesela, memoria.name, filas, columnas, rect,
+                                    prob_suelo, semilla, generador)
+                        for rect in teselas(filas, columnas, tam_tile)]
+            for trabajo in trabajos:
+                trabajo.result()
+        grilla = GrillaTerreno(filas, columnas)
+        grilla.codigos[:] = np.ndarray((filas, columnas), dtype=np.uint8, buffer=memoria.buf)
+        return grilla
+    finally:
+        memoria.close()
+        memoria.unlink()
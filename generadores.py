@@ -0,0 +1,165 @@
+# Generadores de terreno intercambiables.
+#
+# Un generador es una función generador(mapa, prob_suelo, rng) que rellena
+# mapa.base_matriz con suelo y muros; la conectividad, el portal y las
+# entidades los resuelve después Mapa.generar_mapa, igual para todos.
+# Se registran por nombre con @registrar_generador y se eligen con
+# Mapa(generador=...) o por nivel con generador_para_nivel().
+#
+#   - 'ruido':  cada celda es suelo con probabilidad prob_suelo (clásico)
+#   - 'cuevas': autómata celular suavizado con sumas de vecinos en NumPy
+#   - 'bsp':    salas en una partición binaria del espacio unidas por pasillos
+
+from config import TERRAIN_GENERATOR, LEVEL_GENERATORS
+from terreno import GrillaTerreno, CARACTERES, SUELO, np
+
+GENERADORES = {}
+
+
+def registrar_generador(nombre):
+    """Decorador que registra un generador de terreno con `nombre`."""
+    def decorador(funcion):
+        GENERADORES[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def obtener_generador(nombre):
+    try:
+        return GENERADORES[nombre]
+    except KeyError:
+        raise ValueError(f"Generador de terreno desconocido: {nombre!r} "
+                         f"(opciones: {', '.join(sorted(GENERADORES))})") from None
+
+
+def generador_para_nivel(nivel):
+    """Nombre del generador configurado para el nivel (LEVEL_GENERATORS)."""
+    return LEVEL_GENERATORS.get(nivel, TERRAIN_GENERATOR)
+
+
+# ===================== Utilidades =====================
+def _rng_numpy(rng):
+    """Generator de NumPy derivado del RNG de Python (misma semilla => mismo mapa)."""
+    return np.random.default_rng(rng.getrandbits(64))
+
+
+def volcar_mascara(mapa, suelo):
+    """Escribe en base_matriz una matriz booleana de NumPy (True = suelo)."""
+    if isinstance(mapa.base_matriz, GrillaTerreno):
+        np.copyto(mapa.base_matriz.codigos, suelo, casting='unsafe')
+        return
+    muro, piso = CARACTERES[0], CARACTERES[SUELO]
+    for fila, valores in zip(mapa.base_matriz, suelo.tolist()):
+        fila[:] = [piso if v else muro for v in valores]
+
+
+def rellenar_muros(mapa):
+    if isinstance(mapa.base_matriz, GrillaTerreno):
+        mapa.base_matriz.codigos.fill(0)
+        return
+    for fila in mapa.base_matriz:
+        fila[:] = [CARACTERES[0]] * len(fila)
+
+
+def abrir_rectangulo(mapa, x0, y0, x1, y1):
+    """Convierte en suelo el rectángulo [x0, x1) x [y0, y1)."""
+    if x0 >= x1 or y0 >= y1:
+        return
+    if isinstance(mapa.base_matriz, GrillaTerreno):
+        mapa.base_matriz.codigos[x0:x1, y0:y1] = SUELO
+        return
+    tramo = [CARACTERES[SUELO]] * (y1 - y0)
+    for x in range(x0, x1):
+        mapa.base_matriz[x][y0:y1] = tramo
+
+
+# ===================== Generadores =====================
+@registrar_generador('ruido')
+def generar_ruido(mapa, prob_suelo, rng):
+    """Rellena el mapa con suelo '.' según una probabilidad y el resto como muros ' '."""
+    if isinstance(mapa.base_matriz, GrillaTerreno):
+        # Un único sorteo vectorizado
+        mapa.base_matriz.rellenar_aleatorio(prob_suelo, _rng_numpy(rng))
+        return
+    for i in range(mapa.filas):
+        fila = mapa.base_matriz[i]
+        for j in range(mapa.columnas):
+            fila[j] = '.' if rng.random() < prob_suelo else ' '
+
+
+@registrar_generador('cuevas')
+def generar_cuevas(mapa, prob_suelo, rng, iteraciones=4, umbral_muro=5):
+    """Cuevas por autómata celular: ruido inicial y `iteraciones` de suavizado.
+
+    Una celda pasa a muro si en su vecindad 3x3 (ella incluida) hay al
+    menos `umbral_muro` muros; el borde del mapa cuenta como muro. Los
+    vecinos se suman con 9 cortes desplazados de una copia con relleno,
+    sin bucles de Python por celda.
+    """
+    if np is None:
+        raise ImportError("El generador 'cuevas' requiere tener NumPy instalado")
+    filas, columnas = mapa.filas, mapa.columnas
+    muros = _rng_numpy(rng).random((filas, columnas), dtype=np.float32) >= prob_suelo
+    relleno = np.ones((filas + 2, columnas + 2), dtype=np.uint8)
+    suma = np.empty((filas, columnas), dtype=np.uint8)
+    for _ in range(iteraciones):
+        relleno[1:-1, 1:-1] = muros
+        suma.fill(0)
+        for di in range(3):
+            for dj in range(3):
+                suma += relleno[di:di + filas, dj:dj + columnas]
+        muros = suma >= umbral_muro
+    volcar_mascara(mapa, ~muros)
+
+
+@registrar_generador('bsp')
+def generar_bsp(mapa, prob_suelo, rng, hoja_min=8):
+    """Salas y pasillos por partición binaria del espacio (BSP).
+
+    Se parte el mapa en rectángulos hasta que miden menos de 2 * hoja_min,
+    se abre una sala en cada hoja y se une cada par de hermanos con un
+    pasillo en L entre los centros de sus salas. `prob_suelo` escala el
+    tamaño de las salas dentro de su hoja.
+    """
+    rellenar_muros(mapa)
+    # Cada nodo: [x0, y0, x1, y1, hijo_a, hijo_b, centro_sala]
+    raiz = [0, 0, mapa.filas, mapa.columnas, None, None, None]
+    pendientes = [raiz]
+    postorden = []
+    while pendientes:
+        nodo = pendientes.pop()
+        postorden.append(nodo)
+        x0, y0, x1, y1 = nodo[:4]
+        alto, ancho = x1 - x0, y1 - y0
+        puede_h = alto >= 2 * hoja_min
+        puede_v = ancho >= 2 * hoja_min
+        if not (puede_h or puede_v):
+            continue
+        horizontal = puede_h and (not puede_v or (alto > ancho if alto != ancho else rng.random() < 0.5))
+        if horizontal:
+            corte = rng.randint(x0 + hoja_min, x1 - hoja_min)
+            nodo[4] = [x0, y0, corte, y1, None, None, None]
+            nodo[5] = [corte, y0, x1, y1, None, None, None]
+        else:
+            corte = rng.randint(y0 + hoja_min, y1 - hoja_min)
+            nodo[4] = [x0, y0, x1, corte, None, None, None]
+            nodo[5] = [x0, corte, x1, y1, None, None, None]
+        pendientes.append(nodo[4])
+        pendientes.append(nodo[5])
+
+    # De las hojas a la raíz: abrir salas y unir hermanos
+    escala = max(0.3, min(1.0, prob_suelo + 0.1))
+    for nodo in reversed(postorden):
+        x0, y0, x1, y1, a, b, _ = nodo
+        if a is None:
+            alto = max(1, int((x1 - x0 - 2) * escala))
+            ancho = max(1, int((y1 - y0 - 2) * escala))
+            sx = min(x1 - 1, rng.randint(x0 + 1, max(x0 + 1, x1 - 1 - alto)))
+            sy = min(y1 - 1, rng.randint(y0 + 1, max(y0 + 1, y1 - 1 - ancho)))
+            abrir_rectangulo(mapa, sx, sy, min(x1, sx + alto), min(y1, sy + ancho))
+            nodo[6] = (min(x1 - 1, sx + alto // 2), min(y1 - 1, sy + ancho // 2))
+        else:
+            (ax, ay), (bx, by) = a[6], b[6]
+            abrir_rectangulo(mapa, min(ax, bx), ay, max(ax, bx) + 1, ay + 1)
+            abrir_rectangulo(mapa, bx, min(ay, by), bx + 1, max(ay, by) + 1)
+            nodo[6] = a[6] if rng.random() < 0.5 else b[6]
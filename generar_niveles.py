@@ -0,0 +1,98 @@
+# Generador de paquetes de niveles fuera del juego.
+#
+# Genera N niveles repartidos entre un tamaño mínimo y uno máximo, con
+# semillas consecutivas, en un pool de procesos, y los guarda en un paquete
+# (paquete_niveles.py). Opcionalmente vuelca a CSV las estadísticas de
+# generación de cada nivel (Mapa.estadisticas + tiempo y tamaño del registro).
+#
+#   python generar_niveles.py --cantidad 200 --tam-min 16 --tam-max 300 \
+#       --salida niveles.pack --estadisticas niveles.csv
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import TERRAIN_BACKEND, TERRAIN_GENERATOR
+from generadores import GENERADORES
+from mapa import Mapa
+from paquete_niveles import escribir_paquete, nivel_a_bytes
+
+COLUMNAS_CSV = ('indice', 'filas', 'columnas', 'semilla', 'generador', 'tiempo_s', 'nivel', 'prob_suelo',
+                'reintentos', 'celdas_cosidas', 'corredor_l', 'area_alcanzable', 'distancia_portal',
+                'enemigos', 'cofres', 'bytes')
+
+
+def trabajos(cantidad, tam_min, tam_max, semilla, generador, backend):
+    """Parámetros de cada nivel: tamaños repartidos linealmente entre min y max."""
+    for i in range(cantidad):
+        tam = tam_min + (tam_max - tam_min) * i // max(1, cantidad - 1)
+        yield i, tam, tam, semilla + i, generador, backend
+
+
+def generar_nivel(trabajo):
+    """Trabajo de un proceso: genera un nivel; devuelve (registro, estadísticas)."""
+    indice, filas, columnas, semilla, generador, backend = trabajo
+    inicio = time.perf_counter()
+    mapa = Mapa(filas, columnas, seed=semilla, backend=backend, generador=generador)
+    mapa.generar_mapa()
+    tiempo = time.perf_counter() - inicio
+    registro = nivel_a_bytes(mapa)
+    estadisticas = dict(mapa.estadisticas, indice=indice, filas=filas, columnas=columnas, semilla=semilla,
+                        generador=generador, tiempo_s=round(tiempo, 6), bytes=len(registro))
+    return registro, estadisticas
+
+
+def resumen(estadisticas):
+    n = len(estadisticas)
+    tiempos = [e['tiempo_s'] for e in estadisticas]
+    print(f"Niveles: {n}")
+    print(f"Tiempo de generación: total {sum(tiempos):.3f} s, medio {sum(tiempos) / n:.4f} s, "
+          f"máximo {max(tiempos):.4f} s")
+    print(f"Corredor en L: {sum(e['corredor_l'] for e in estadisticas)} niveles; "
+          f"celdas cosidas de media: {sum(e['celdas_cosidas'] for e in estadisticas) / n:.1f}")
+    print(f"Área alcanzable media: {sum(e['area_alcanzable'] for e in estadisticas) / n:.1f}; "
+          f"distancia media al portal: {sum(e['distancia_portal'] for e in estadisticas) / n:.1f}")
+    print(f"Tamaño del paquete: {sum(e['bytes'] for e in estadisticas)} bytes de registros")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera un paquete de niveles en paralelo')
+    parser.add_argument('--cantidad', type=int, required=True, help='Número de niveles')
+    parser.add_argument('--tam-min', type=int, default=16, help='Lado del mapa más pequeño')
+    parser.add_argument('--tam-max', type=int, default=100, help='Lado del mapa más grande')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla del primer nivel (las demás consecutivas)')
+    parser.add_argument('--generador', choices=sorted(GENERADORES), default=TERRAIN_GENERATOR)
+    parser.add_argument('--backend', choices=('lista', 'numpy'), default=TERRAIN_BACKEND)
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos (por defecto, uno por núcleo)')
+    parser.add_argument('--salida', default='niveles.pack', help='Fichero del paquete')
+    parser.add_argument('--estadisticas', default=None, help='CSV con las estadísticas por nivel')
+    args = parser.parse_args()
+    if args.cantidad < 1 or args.tam_min < 1 or args.tam_max < args.tam_min:
+        parser.error('se necesita --cantidad >= 1 y 1 <= --tam-min <= --tam-max')
+
+    estadisticas = []
+
+    def registros(resultados):
+        for registro, stats in resultados:
+            estadisticas.append(stats)
+            yield registro
+
+    inicio = time.perf_counter()
+    lista = trabajos(args.cantidad, args.tam_min, args.tam_max, args.semilla, args.generador, args.backend)
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        resultados = pool.map(generar_nivel, lista, chunksize=max(1, args.cantidad // (4 * (os.cpu_count() or 1))))
+        escribir_paquete(args.salida, registros(resultados), args.cantidad)
+    print(f"Paquete escrito en {args.salida} ({time.perf_counter() - inicio:.2f} s de reloj)")
+
+    if args.estadisticas:
+        with open(args.estadisticas, 'w', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS_CSV, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(estadisticas)
+    resumen(estadisticas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# Historial de turnos para deshacer (rebobinar) una partida.
+#
+# Cada turno se guarda una instantánea del jugador, los enemigos, los
+# cofres y la niebla. El terreno no cambia al jugar y no se copia nunca.
+# Lo demás se comparte entre instantáneas siempre que no haya cambiado:
+#
+#   - los bits de la niebla y los enemigos empaquetados (serializacion.py)
+#     se guardan como árboles de dos niveles: bloques de bytes agrupados
+#     de GRUPO en GRUPO. Un turno sólo copia los bloques que cambiaron y
+#     los grupos que los contienen; el resto son referencias a los de la
+#     instantánea anterior;
+#   - los cofres, como un byte de abierto/cerrado por cofre que se
+#     reutiliza si ninguno se abrió.
+#
+# Los bloques que cambian se anotan al cambiar: la simulación pasa las
+# celdas reveladas a marcar_niebla y el Mapa avisa de cada enemigo movido
+# o eliminado y de cada cofre abierto (mapa.historial). Así, guardar miles
+# de turnos cuesta memoria y tiempo proporcionales a lo que cambia en cada
+# uno y no al tamaño del mapa ni a la cantidad de enemigos.
+
+from collections import deque
+
+from serializacion import ENEMIGO, empaquetar_enemigos, desempaquetar_enemigos
+
+GRUPO = 64                            # bloques por grupo
+BLOQUE_NIEBLA = 256                   # bytes de niebla por bloque (2048 celdas)
+ENEMIGOS_POR_BLOQUE = 8
+BLOQUE_ENEMIGOS = ENEMIGOS_POR_BLOQUE * ENEMIGO.size
+
+
+def _arbol(datos, bloque):
+    """Parte `datos` en bloques de `bloque` bytes agrupados de GRUPO en GRUPO."""
+    bloques = [bytes(datos[i:i + bloque]) for i in range(0, len(datos), bloque)]
+    return tuple(tuple(bloques[g:g + GRUPO]) for g in range(0, len(bloques), GRUPO))
+
+
+def _actualizar(arbol, bloques):
+    """Árbol que comparte con `arbol` todo bloque salvo los de `bloques`.
+
+    `bloques` da (índice, bytes nuevos) de los bloques que pueden haber
+    cambiado; sólo se copia el bloque si de verdad cambió.
+    """
+    grupos = list(arbol)
+    copiados = {}
+    for b, nuevo in bloques:
+        g, k = divmod(b, GRUPO)
+        grupo = copiados.get(g)
+        if grupo is None:
+            if nuevo == arbol[g][k]:
+                continue
+            grupo = copiados[g] = list(arbol[g])
+        grupo[k] = nuevo
+    if not copiados:
+        return arbol
+    for g, grupo in copiados.items():
+        grupos[g] = tuple(grupo)
+    return tuple(grupos)
+
+
+def _bloques_distintos(arbol, otro):
+    """(índice, bloque de `otro`) para cada bloque que no comparten los dos árboles."""
+    for g, (grupo, grupo_otro) in enumerate(zip(arbol, otro)):
+        if grupo is grupo_otro:
+            continue
+        for k, (b, b_otro) in enumerate(zip(grupo, grupo_otro)):
+            if b is not b_otro:
+                yield g * GRUPO + k, b_otro
+
+
+class Instantanea:
+    __slots__ = ('jugador', 'enemigos', 'n_enemigos', 'cofres', 'niebla', 'explorado')
+
+    def __init__(self, jugador, enemigos, n_enemigos, cofres, niebla, explorado):
+        self.jugador = jugador        # tupla con posición, vida e inventario
+        self.enemigos = enemigos      # árbol de empaquetar_enemigos
+        self.n_enemigos = n_enemigos
+        self.cofres = cofres          # bytes: 1 si el cofre está abierto
+        self.niebla = niebla          # árbol de los bits de la niebla
+        self.explorado = explorado
+
+
+def _estado_jugador(j):
+    return (j.x, j.y, j.movimientos, j.corazones_totales, j.corazones_llenos,
+            j.armaduras, j.espadas, j.puntuacion)
+
+
+class Historial:
+    """Últimos `capacidad` turnos de un mapa, con deshacer."""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.mapa = None
+        self._turnos = deque(maxlen=capacidad + 1)  # +1: el estado actual
+        self._bloques_sucios = set()
+        self._enemigos_sucios = set()   # bloques de enemigos a reempaquetar
+        self._huecos = None             # id(enemigo) -> posición en mapa.enemigos (None: rehacer)
+        self._cofres_sucios = False
+
+    def __len__(self):
+        """Turnos que se pueden deshacer."""
+        return max(0, len(self._turnos) - 1)
+
+    def reiniciar(self, mapa):
+        """Empieza el historial de `mapa` con su estado actual como turno 0."""
+        if self.mapa is not None and self.mapa.historial is self:
+            self.mapa.historial = None
+        self.mapa = mapa
+        mapa.historial = self
+        self._turnos.clear()
+        self._huecos = None
+        self._limpiar()
+        self._turnos.append(Instantanea(_estado_jugador(mapa.jugador),
+                                        _arbol(empaquetar_enemigos(mapa.enemigos), BLOQUE_ENEMIGOS),
+                                        len(mapa.enemigos), bytes(c.abierto for c in mapa.cofres),
+                                        _arbol(mapa.revelado.bits, BLOQUE_NIEBLA), mapa.revelado.explorado))
+
+    def marcar_niebla(self, celdas):
+        """Anota las celdas reveladas este turno (lo que devuelve revelar_area)."""
+        columnas = self.mapa.columnas
+        self._bloques_sucios.update((x * columnas + y) // (8 * BLOQUE_NIEBLA) for x, y in celdas)
+
+    # Avisos de Mapa (ver mapa.historial)
+    def enemigo_movido(self, enemigo):
+        if self._huecos is None:
+            return
+        i = self._huecos.get(id(enemigo))
+        if i is None:
+            self._huecos = None
+        else:
+            self._enemigos_sucios.add(i // ENEMIGOS_POR_BLOQUE)
+
+    def enemigo_eliminado(self):
+        # Los que van detrás se desplazan: se reempaqueta todo en registrar
+        self._huecos = None
+
+    def cofre_abierto(self):
+        self._cofres_sucios = True
+
+    def registrar(self):
+        """Guarda el turno recién jugado como nueva instantánea."""
+        mapa = self.mapa
+        anterior = self._turnos[-1]
+
+        if self._huecos is not None and len(mapa.enemigos) == anterior.n_enemigos:
+            enemigos = _actualizar(anterior.enemigos, (
+                (b, empaquetar_enemigos(mapa.enemigos[b * ENEMIGOS_POR_BLOQUE:(b + 1) * ENEMIGOS_POR_BLOQUE]))
+                for b in sorted(self._enemigos_sucios)))
+        else:
+            # Murió algún enemigo (o cambió la lista): se parte de cero
+            enemigos = _arbol(empaquetar_enemigos(mapa.enemigos), BLOQUE_ENEMIGOS)
+        cofres = anterior.cofres
+        if self._cofres_sucios or len(mapa.cofres) != len(cofres):
+            cofres = bytes(c.abierto for c in mapa.cofres)
+            if cofres == anterior.cofres:
+                cofres = anterior.cofres
+        bits = mapa.revelado.bits
+        niebla = _actualizar(anterior.niebla, ((b, bytes(bits[b * BLOQUE_NIEBLA:(b + 1) * BLOQUE_NIEBLA]))
+                                               for b in sorted(self._bloques_sucios)))
+        self._limpiar()
+
+        self._turnos.append(Instantanea(_estado_jugador(mapa.jugador), enemigos, len(mapa.enemigos),
+                                        cofres, niebla, mapa.revelado.explorado))
+
+    def deshacer(self, turnos=1):
+        """Vuelve `turnos` atrás (como mucho hasta el más antiguo guardado).
+
+        Devuelve cuántos turnos se deshicieron.
+        """
+        turnos = min(turnos, len(self))
+        if turnos <= 0:
+            return 0
+        actual = self._turnos[-1]
+        for _ in range(turnos):
+            self._turnos.pop()
+        self._restaurar(actual, self._turnos[-1])
+        return turnos
+
+    def _restaurar(self, actual, destino):
+        mapa = self.mapa
+        j = mapa.jugador
+        (j.x, j.y, j.movimientos, j.corazones_totales, j.corazones_llenos,
+         j.armaduras, j.espadas, j.puntuacion) = destino.jugador
+        if destino.enemigos is not actual.enemigos:
+            datos = b''.join(b for grupo in destino.enemigos for b in grupo)
+            mapa.enemigos, _ = desempaquetar_enemigos(datos, 0, destino.n_enemigos)
+            self._huecos = None
+        if destino.cofres is not actual.cofres:
+            for cofre, abierto in zip(mapa.cofres, destino.cofres):
+                cofre.abierto = bool(abierto)
+        if destino.enemigos is not actual.enemigos or destino.cofres is not actual.cofres:
+            mapa.indexar_entidades()
+
+        # Sólo se reescriben los bloques de niebla que no comparten
+        bits = mapa.revelado.bits
+        for b, bloque in _bloques_distintos(actual.niebla, destino.niebla):
+            inicio = b * BLOQUE_NIEBLA
+            bits[inicio:inicio + len(bloque)] = bloque
+        mapa.revelado.explorado = destino.explorado
+        self._limpiar()
+
+    def _limpiar(self):
+        """Nada pendiente de anotar: el mapa coincide con la última instantánea."""
+        self._bloques_sucios.clear()
+        self._enemigos_sucios.clear()
+        self._cofres_sucios = False
+        if self._huecos is None:
+            self._huecos = {id(e): i for i, e in enumerate(self.mapa.enemigos)}
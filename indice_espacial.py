@@ -0,0 +1,89 @@
+# Índice espacial de entidades (hash por rejilla).
+#
+# Guarda dónde está cada entidad (cualquier objeto con .x y .y) en dos
+# niveles: por celda exacta, para saber en O(1) quién hay en (x, y), y por
+# cubos de lado x lado celdas, para consultar un rectángulo (p. ej. la
+# ventana visible) mirando sólo los cubos que lo tocan. Se actualiza de
+# forma incremental: quien mueve una entidad avisa con mover().
+#
+# Las celdas y los cubos son dicts (ordenados por inserción), así que las
+# consultas son deterministas.
+
+
+class IndiceEspacial:
+    def __init__(self, columnas, lado=16):
+        self.columnas = columnas
+        self.lado = lado
+        self._celdas = {}   # idx plano -> [entidades]
+        self._cubos = {}    # (ci, cj) -> {entidad: None}
+
+    def __len__(self):
+        return sum(len(cubo) for cubo in self._cubos.values())
+
+    def vaciar(self):
+        self._celdas.clear()
+        self._cubos.clear()
+
+    def agregar(self, entidad):
+        self._agregar_en(entidad, entidad.x, entidad.y)
+
+    def quitar(self, entidad):
+        """Quita la entidad de su posición actual (si estaba)."""
+        self._quitar_de(entidad, entidad.x, entidad.y)
+
+    def mover(self, entidad, x0, y0):
+        """La entidad pasó de (x0, y0) a su posición actual; True si cambió de cubo."""
+        if (x0, y0) != (entidad.x, entidad.y):
+            self._quitar_de(entidad, x0, y0)
+            self._agregar_en(entidad, entidad.x, entidad.y)
+            return (x0 // self.lado, y0 // self.lado) != self.cubo(entidad.x, entidad.y)
+        return False
+
+    def cubo(self, x, y):
+        """(ci, cj) del cubo que contiene (x, y)."""
+        return x // self.lado, y // self.lado
+
+    def en_celda(self, x, y):
+        """Entidades en (x, y), en orden de llegada (lista nueva)."""
+        return list(self._celdas.get(x * self.columnas + y, ()))
+
+    def en_rectangulo(self, x0, y0, x1, y1):
+        """Entidades con x0 <= x < x1 e y0 <= y < y1."""
+        lado = self.lado
+        cubos = self._cubos
+        resultado = []
+        for ci in range(x0 // lado, (x1 - 1) // lado + 1):
+            for cj in range(y0 // lado, (y1 - 1) // lado + 1):
+                cubo = cubos.get((ci, cj))
+                if cubo:
+                    resultado.extend(e for e in cubo if x0 <= e.x < x1 and y0 <= e.y < y1)
+        return resultado
+
+    def en_cubos(self, ci, cj, anillos=1):
+        """Entidades de los cubos a `anillos` o menos de (ci, cj) (lista nueva)."""
+        cubos = self._cubos
+        resultado = []
+        for i in range(ci - anillos, ci + anillos + 1):
+            for j in range(cj - anillos, cj + anillos + 1):
+                cubo = cubos.get((i, j))
+                if cubo:
+                    resultado.extend(cubo)
+        return resultado
+
+    def _agregar_en(self, entidad, x, y):
+        self._celdas.setdefault(x * self.columnas + y, []).append(entidad)
+        self._cubos.setdefault((x // self.lado, y // self.lado), {})[entidad] = None
+
+    def _quitar_de(self, entidad, x, y):
+        idx = x * self.columnas + y
+        lista = self._celdas.get(idx)
+        if lista is None or entidad not in lista:
+            return
+        lista.remove(entidad)
+        if not lista:
+            del self._celdas[idx]
+        clave = (x // self.lado, y // self.lado)
+        cubo = self._cubos[clave]
+        del cubo[entidad]
+        if not cubo:
+            del self._cubos[clave]
@@ -1,58 +1,61 @@
-
-# Clase Juego (lógica principal y bucle)
+# Clase Juego: ventana de pygame sobre el núcleo de la simulación
+#
+# Las reglas viven en simulacion.py; Juego traduce teclas en acciones,
+# eventos en mensajes y dibuja el estado.
 
 import pygame
 import sys
 import math
 import random
-from config import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, VISIBLE_RADIUS, FPS
+import time
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, FPS, SAVE_PATH, REPLAY_SPEED
 from config import BLACK, WHITE, GRAY, DARK_GRAY, GREEN, BROWN, RED, BLUE, YELLOW, PURPLE
-from mapa import Mapa
+from repeticion import ARRIBA, ABAJO, IZQUIERDA, DERECHA, DESHACER
+from simulacion import (Simulacion, NIVEL, PORTAL, COFRE, ESPADA, EMPUJON, CORAZON, DERROTA,
+                        DESHACER_TURNO, CARGADA)
+
+# Tecla -> acción del jugador
+TECLAS = {pygame.K_w: ARRIBA, pygame.K_s: ABAJO, pygame.K_a: IZQUIERDA, pygame.K_d: DERECHA,
+          pygame.K_u: DESHACER}
+
 
 class Juego:
-    def __init__(self):
-        self.mapa_actual = None
-        self.nivel = 1
+    def __init__(self, semilla=None):
+        """`semilla` fija los mapas de toda la partida (por defecto, LEVEL_SEED)."""
+        self.sim = Simulacion(semilla)
         self.screen = None
-        self.clock = pygame.time.Clock()
+        self.clock = None
         self.font = None
         self.mensaje = ""
         self.mensaje_tiempo = 0
         self.pista_portal = ""
+        self.rng = random.Random(self.sim.semilla)
+
+    @property
+    def mapa_actual(self):
+        return self.sim.mapa
+
+    @property
+    def nivel(self):
+        return self.sim.nivel
 
     def iniciar_pygame(self):
+        # Sólo los subsistemas que usa la ventana (nada de audio ni joystick)
+        pygame.display.init()
+        pygame.font.init()
         pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN])
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Aventura optimizada (corazones y puntuación)")
         self.font = pygame.font.SysFont(None, 24)
+        self.clock = pygame.time.Clock()
 
-    def cambiar_mapa(self, filas, columnas):
-        # Si es el primer mapa, crear jugador normal
-        if self.mapa_actual is None:
-            self.mapa_actual = Mapa(filas, columnas)
-            self.mapa_actual.generar_mapa()
-        else:
-            # Guardar estado del jugador
-            j_prev = self.mapa_actual.jugador
-            self.mapa_actual = Mapa(filas, columnas)
-            self.mapa_actual.generar_mapa()
-            # Transferir stats
-            j = self.mapa_actual.jugador
-            j.corazones_totales = j_prev.corazones_totales
-            j.corazones_llenos = j_prev.corazones_llenos
-            j.armaduras = j_prev.armaduras
-            j.espadas = j_prev.espadas
-            j.puntuacion = j_prev.puntuacion
-
-        self.mostrar_mensaje(f"--- Nivel {self.nivel} ---")
-
-        # Generar pista estática del portal
-        px, py = self.mapa_actual.portal
-        self.pista_portal = f"({px}, ?)" if random.choice([True, False]) else f"(?, {py})"
-
-    def iniciar(self):
+    def iniciar(self, grabar=None):
+        """Bucle principal con pygame; si `grabar` es una ruta, graba una repetición."""
         self.iniciar_pygame()
-        self.cambiar_mapa(15, 15)
+        if grabar is not None:
+            self.sim.empezar_grabacion(grabar)
+            self.rng.seed(self.sim.semilla)
+        self.procesar_eventos(self.sim.reiniciar())
         running = True
         while running:
             for event in pygame.event.get():
@@ -61,135 +64,111 @@ class Juego:
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_q:
                         running = False
-
-                    dx, dy = 0, 0
-                    if event.key == pygame.K_w: dx = -1
-                    elif event.key == pygame.K_s: dx = 1
-                    elif event.key == pygame.K_a: dy = -1
-                    elif event.key == pygame.K_d: dy = 1
-
-                    if dx != 0 or dy != 0:
-                        if self.mapa_actual.jugador.mover(dx, dy, self.mapa_actual.base_matriz):
-                            self.mapa_actual.revelar_area(self.mapa_actual.jugador.x,
-                                                          self.mapa_actual.jugador.y,
-                                                          VISIBLE_RADIUS)
-                            for enemigo in self.mapa_actual.enemigos:
-                                enemigo.mover_hacia_jugador(self.mapa_actual.jugador,
-                                                            self.mapa_actual.base_matriz,
-                                                            self.mapa_actual.jugador.movimientos)
-
-                            self.verificar_cofre()
-
-                            if self.resolver_colisiones_enemigos():
-                                running = False
-
-                            if self.verificar_portal():
-                                self.mostrar_mensaje("¡Portal encontrado! Pasando al siguiente nivel...")
-                                self.nivel += 1
-                                j = self.mapa_actual.jugador
-                                j.corazones_totales += 1  # Añadir corazón vacío
-                                self.recargar_corazones(j)  # Intentar recargar usando puntuación
-                                self.cambiar_mapa(15 + self.nivel, 15 + self.nivel)
-
-            if pygame.time.get_ticks() - self.mensaje_tiempo > 3000:
+                    elif event.key == pygame.K_F5:
+                        self.guardar()
+                    elif event.key == pygame.K_F9:
+                        self.cargar()
+
+                    accion = TECLAS.get(event.key)
+                    if accion is not None:
+                        self.procesar_eventos(self.sim.step(accion))
+                        if self.sim.terminada:
+                            running = False
+
+            if time.monotonic() - self.mensaje_tiempo > 3:
                 self.mensaje = ""
 
             self.dibujar()
             self.clock.tick(FPS)
 
+        self.sim.cerrar()
         pygame.quit()
         sys.exit()
 
-    # ---------------- Lógica ----------------
-    def mostrar_mensaje(self, texto):
-        self.mensaje = texto
-        self.mensaje_tiempo = pygame.time.get_ticks()
-
-    def resolver_colisiones_enemigos(self):
-        j = self.mapa_actual.jugador
-        colisionados = [e for e in self.mapa_actual.enemigos if j.x == e.x and j.y == e.y]
-        if not colisionados:
+    def reproducir(self, ruta, tiempo_real=False):
+        """Reproduce una repetición; devuelve las acciones jugadas.
+
+        Sin `tiempo_real` no abre ventana ni espera entre turnos. Lanza
+        repeticion.Divergencia si el estado no coincide con la grabación.
+        """
+        al_avanzar = None
+        if tiempo_real:
+            self.iniciar_pygame()
+
+            def al_avanzar(eventos):
+                self.procesar_eventos(eventos)
+                pygame.event.pump()
+                self.dibujar()
+                self.clock.tick(REPLAY_SPEED)
+        try:
+            return self.sim.reproducir(ruta, al_avanzar)
+        finally:
+            self.sim.cerrar()
+
+    # ---------------- Partidas ----------------
+    def guardar(self, ruta=SAVE_PATH):
+        try:
+            self.sim.guardar(ruta)
+        except (OSError, ValueError) as e:
+            self.mostrar_mensaje(f"No se pudo guardar: {e}")
             return False
-
-        for e in colisionados:
-            if j.espadas > 0:
-                j.espadas -= 1
-                self.mapa_actual.enemigos.remove(e)
+        self.mostrar_mensaje("Partida guardada.")
+        return True
+
+    def cargar(self, ruta=SAVE_PATH):
+        try:
+            eventos = self.sim.cargar(ruta)
+        except (OSError, ValueError) as e:
+            self.mostrar_mensaje(f"No se pudo cargar: {e}")
+            return False
+        self.procesar_eventos(eventos)
+        return True
+
+    # ---------------- Eventos ----------------
+    def procesar_eventos(self, eventos):
+        """Muestra el mensaje de cada evento de la simulación (queda el último)."""
+        for evento in eventos:
+            tipo = evento[0]
+            if tipo == NIVEL or tipo == CARGADA:
+                if tipo == NIVEL:
+                    self.mostrar_mensaje(f"--- Nivel {evento[1]} ---")
+                else:
+                    self.mostrar_mensaje(f"Partida cargada: nivel {evento[1]}.")
+                # Generar pista estática del portal
+                px, py = self.sim.mapa.portal
+                self.pista_portal = f"({px}, ?)" if self.rng.choice([True, False]) else f"(?, {py})"
+            elif tipo == PORTAL:
+                self.mostrar_mensaje("¡Portal encontrado! Pasando al siguiente nivel...")
+            elif tipo == COFRE:
+                _, contenido, valor, puntos = evento
+                if contenido == 'armadura':
+                    self.mostrar_mensaje("¡Cofre abierto! ARMADURA obtenida.")
+                elif contenido == 'espada':
+                    self.mostrar_mensaje("¡Cofre abierto! ESPADA obtenida.")
+                elif contenido == 'dinero':
+                    self.mostrar_mensaje(f"¡Cofre abierto! Dinero +{valor}. Puntos: {puntos}")
+            elif tipo == ESPADA:
                 self.mostrar_mensaje("Usaste una ESPADA: enemigo eliminado!")
-                continue
-
-            if j.armaduras > 0:
-                j.armaduras -= 1
-                if self.empujar_enemigo(e, pasos=2):
-                    self.mostrar_mensaje("Usaste ARMADURA: enemigo empujado!")
+            elif tipo == EMPUJON:
+                self.mostrar_mensaje("Usaste ARMADURA: enemigo empujado!")
+            elif tipo == CORAZON:
+                _, llenos, totales, empujon = evento
+                if empujon:
+                    self.mostrar_mensaje(f"No se pudo empujar: perdiste un corazón ({llenos}/{totales})")
                 else:
-                    j.perder_corazon()
-                    self.mostrar_mensaje(f"No se pudo empujar: perdiste un corazón ({j.corazones_llenos}/{j.corazones_totales})")
-                    if j.corazones_llenos == 0:
-                        self.mostrar_mensaje("¡Has sido derrotado!")
-                        return True
-                continue
-
-            # Sin items: perder corazón
-            j.perder_corazon()
-            self.mostrar_mensaje(f"¡Perdiste un corazón! ({j.corazones_llenos}/{j.corazones_totales})")
-            if j.corazones_llenos == 0:
+                    self.mostrar_mensaje(f"¡Perdiste un corazón! ({llenos}/{totales})")
+            elif tipo == DERROTA:
                 self.mostrar_mensaje("¡Has sido derrotado!")
-                return True
-
-        return False
-
-    def empujar_enemigo(self, enemigo, pasos=2):
-        dx = enemigo.ultimo_dx
-        dy = enemigo.ultimo_dy
-        if dx == 0 and dy == 0:
-            j = self.mapa_actual.jugador
-            dx = 1 if enemigo.x > j.x else -1 if enemigo.x < j.x else 0
-            dy = 1 if enemigo.y > j.y else -1 if enemigo.y < j.y else 0
-        dx *= -1
-        dy *= -1
-        final_x, final_y = enemigo.x, enemigo.y
-        for step in range(1, pasos + 1):
-            nx = enemigo.x + dx * step
-            ny = enemigo.y + dy * step
-            if 0 <= nx < self.mapa_actual.filas and 0 <= ny < self.mapa_actual.columnas:
-                if self.mapa_actual.base_matriz[nx][ny] in ('.', 'S'):
-                    final_x, final_y = nx, ny
+            elif tipo == DESHACER_TURNO:
+                if evento[1] < 0:
+                    self.mostrar_mensaje("No hay turnos que deshacer.")
                 else:
-                    break
-            else:
-                break
-        if (final_x, final_y) != (enemigo.x, enemigo.y):
-            enemigo.x, enemigo.y = final_x, final_y
-            return True
-        return False
+                    self.mostrar_mensaje(f"Turno deshecho ({evento[1]} disponibles).")
 
-    def verificar_cofre(self):
-        j = self.mapa_actual.jugador
-        for c in self.mapa_actual.cofres:
-            if not c.abierto and j.x == c.x and j.y == c.y:
-                c.abierto = True
-                if c.contenido == 'armadura':
-                    j.armaduras += 1
-                    self.mostrar_mensaje("¡Cofre abierto! ARMADURA obtenida.")
-                elif c.contenido == 'espada':
-                    j.espadas += 1
-                    self.mostrar_mensaje("¡Cofre abierto! ESPADA obtenida.")
-                elif c.contenido == 'dinero':
-                    j.puntuacion += c.valor
-                    self.mostrar_mensaje(f"¡Cofre abierto! Dinero +{c.valor}. Puntos: {j.puntuacion}")
-                return True
-        return False
-
-    def verificar_portal(self):
-        j = self.mapa_actual.jugador
-        px, py = self.mapa_actual.portal
-        return j.x == px and j.y == py
-
-    def recargar_corazones(self, jugador, costo_por_corazon=100):
-        while jugador.corazones_llenos < jugador.corazones_totales and jugador.puntuacion >= costo_por_corazon:
-            jugador.puntuacion -= costo_por_corazon
-            jugador.corazones_llenos += 1
+    def mostrar_mensaje(self, texto):
+        self.mensaje = texto
+        # Reloj del sistema: el temporizador de pygame no se inicializa
+        self.mensaje_tiempo = time.monotonic()
 
     # ---------------- Render ----------------
     def dibujar(self):
@@ -201,9 +180,10 @@ class Juego:
         start_j = max(0, math.floor((-offset_x) / TILE_SIZE))
         end_j = min(self.mapa_actual.columnas, math.ceil((SCREEN_WIDTH - offset_x) / TILE_SIZE))
 
+        esta_revelada = self.mapa_actual.revelado.esta_revelada
         for i in range(start_i, end_i):
             for j in range(start_j, end_j):
-                if not self.mapa_actual.revelado[i][j]:
+                if not esta_revelada(i, j):
                     continue
                 x = j * TILE_SIZE + offset_x
                 y = i * TILE_SIZE + offset_y
@@ -217,19 +197,17 @@ class Juego:
                     pygame.draw.rect(self.screen, DARK_GRAY, (x, y, TILE_SIZE, TILE_SIZE))
                 pygame.draw.rect(self.screen, GRAY, (x, y, TILE_SIZE, TILE_SIZE), 1)
 
-        def dentro_view(i, j):
-            return start_i <= i < end_i and start_j <= j < end_j
-
-        for c in self.mapa_actual.cofres:
-            if not c.abierto and self.mapa_actual.revelado[c.x][c.y] and dentro_view(c.x, c.y):
+        # Sólo las entidades de la ventana visible (índice espacial del mapa)
+        for c in self.mapa_actual.cofres_en_rectangulo(start_i, start_j, end_i, end_j):
+            if esta_revelada(c.x, c.y):
                 cx = c.y * TILE_SIZE + offset_x
                 cy = c.x * TILE_SIZE + offset_y
                 pygame.draw.rect(self.screen, BROWN, (cx, cy, TILE_SIZE, TILE_SIZE))
                 pygame.draw.rect(self.screen, YELLOW, (cx + 10, cy + 10, TILE_SIZE - 20, TILE_SIZE - 20))
                 pygame.draw.rect(self.screen, GRAY, (cx, cy, TILE_SIZE, TILE_SIZE), 1)
 
-        for e in self.mapa_actual.enemigos:
-            if self.mapa_actual.revelado[e.x][e.y] and dentro_view(e.x, e.y):
+        for e in self.mapa_actual.enemigos_en_rectangulo(start_i, start_j, end_i, end_j):
+            if esta_revelada(e.x, e.y):
                 ex = e.y * TILE_SIZE + offset_x
                 ey = e.x * TILE_SIZE + offset_y
                 pygame.draw.rect(self.screen, RED, (ex, ey, TILE_SIZE, TILE_SIZE))
@@ -260,6 +238,7 @@ class Juego:
         inv_armadura = self.font.render(f"Armaduras: {j.armaduras}", True, WHITE)
         inv_espada = self.font.render(f"Espadas: {j.espadas}", True, WHITE)
         puntaje_texto = self.font.render(f"Puntuación: {j.puntuacion}", True, WHITE)
+        explorado_texto = self.font.render(f"Explorado: {self.mapa_actual.porcentaje_explorado():.1f}%", True, WHITE)
 
         self.screen.blit(nivel_texto, (10, 10))
         self.screen.blit(corazones_texto, (10, 40))
@@ -270,6 +249,7 @@ class Juego:
         self.screen.blit(inv_armadura, (10, 190))
         self.screen.blit(inv_espada, (10, 220))
         self.screen.blit(puntaje_texto, (10, 250))
+        self.screen.blit(explorado_texto, (10, 280))
 
         if self.mensaje:
             msg_surface = self.font.render(self.mensaje, True, YELLOW)
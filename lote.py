@@ -0,0 +1,361 @@
+# Muchas partidas a la vez sobre arrays de NumPy.
+#
+# LoteJuegos avanza n partidas independientes con una sola llamada:
+# step(acciones) aplica a todas las mismas reglas que Simulacion
+# (simulacion.py) -- movimiento del jugador, persecución de los enemigos
+# (por el campo de distancias de flujo.py o voraz, según ENEMY_PATHFINDING),
+# cofres, choques con espada/armadura/corazones y portal -- pero
+# con el estado de todas las partidas en arrays (partida, ...) y sin bucles
+# de Python por partida ni por enemigo.
+#
+# Cada partida es un episodio de un nivel: acaba al llegar al portal
+# (victoria) o al quedarse sin corazones. Las partidas acabadas se
+# reinician solas con un mapa nuevo al final del paso; la máscara
+# 'terminado' del resultado dice cuáles acabaron en ese paso. Los mapas se
+# generan con Mapa como siempre, así que reiniciar cuesta lo que generar un
+# mapa; con `mapas=k` se generan k mapas una vez y cada reinicio copia uno
+# de ellos al azar con operaciones de arrays.
+#
+# No se simula la niebla ni el deshacer: no influyen en las reglas.
+
+from config import TERRAIN_BACKEND, ENEMY_PATHFINDING, ENEMY_FLOW_RADIUS
+from entidades import DIRECCIONES, OBJETO_ARMADURA, OBJETO_ESPADA, OBJETO_DINERO
+from mapa import Mapa
+from repeticion import MOVIMIENTOS
+from serializacion import codigos_terreno
+from simulacion import tamano_nivel, PORTAL, COFRE, ESPADA, EMPUJON, CORAZON, DERROTA
+from terreno import TABLA_PASO_NP, np
+
+# Desplazamiento (dx, dy) por acción; las acciones sin movimiento (DESHACER) no hacen nada
+_DESPLAZAMIENTOS = np.zeros((256, 2), dtype=np.int32) if np is not None else None
+if np is not None:
+    for _accion, _d in MOVIMIENTOS.items():
+        _DESPLAZAMIENTOS[_accion] = _d
+
+# Arrays de estado con la partida como primer eje
+_CAMPOS_PARTIDA = ('paso', 'portal', 'jx', 'jy', 'movimientos', 'corazones_totales', 'corazones_llenos',
+                   'armaduras', 'espadas', 'puntuacion')
+_CAMPOS_ENEMIGOS = ('ex', 'ey', 'e_vivo', 'e_vision', 'e_cadencia', 'e_ultimo', 'e_udx', 'e_udy')
+_CAMPOS_COFRES = ('cx', 'cy', 'c_contenido', 'c_valor', 'c_cerrado')
+
+
+class LoteJuegos:
+    def __init__(self, n, nivel=1, semilla=None, generador=None, backend=None, mapas=None):
+        """`n` partidas del nivel `nivel`; `semilla` hace reproducibles todos los mapas.
+
+        Con `mapas` los reinicios eligen entre esa cantidad de mapas
+        pregenerados en lugar de generar uno nuevo cada vez.
+        """
+        if np is None:
+            raise ImportError("LoteJuegos requiere tener NumPy instalado")
+        self.n = n
+        self.nivel = nivel
+        self.filas, self.columnas = tamano_nivel(nivel)
+        self.semilla = semilla
+        self.generador = generador
+        self.backend = backend or TERRAIN_BACKEND
+        self._rng = np.random.default_rng(semilla)
+        self.episodios = np.zeros(n, dtype=np.int64)   # mapas jugados por partida
+
+        # Terreno y portal
+        self.paso = np.zeros((n, self.filas, self.columnas), dtype=np.bool_)
+        self.portal = np.zeros((n, 2), dtype=np.int32)
+        # Jugador
+        self.jx = np.zeros(n, dtype=np.int32)
+        self.jy = np.zeros(n, dtype=np.int32)
+        self.movimientos = np.zeros(n, dtype=np.int32)
+        self.corazones_totales = np.zeros(n, dtype=np.int32)
+        self.corazones_llenos = np.zeros(n, dtype=np.int32)
+        self.armaduras = np.zeros(n, dtype=np.int32)
+        self.espadas = np.zeros(n, dtype=np.int32)
+        self.puntuacion = np.zeros(n, dtype=np.int32)
+        # Mapas pregenerados (un lote sin reserva propia)
+        self._reserva = None
+        if mapas:
+            self._reserva = LoteJuegos(mapas, nivel, semilla, generador, backend)
+        # Enemigos y cofres: (partida, hueco); la capacidad crece si hace falta
+        self._reservar_enemigos(self._reserva.ex.shape[1] if self._reserva else 0)
+        self._reservar_cofres(self._reserva.cx.shape[1] if self._reserva else 0)
+        # Resultado del episodio en curso
+        self.terminado = np.zeros(n, dtype=np.bool_)
+        self.victoria = np.zeros(n, dtype=np.bool_)
+
+        self.reiniciar(np.arange(n))
+
+    # ===================== Estado =====================
+    def _reservar_enemigos(self, capacidad):
+        n = self.n
+        self.ex = np.zeros((n, capacidad), dtype=np.int32)
+        self.ey = np.zeros((n, capacidad), dtype=np.int32)
+        self.e_vivo = np.zeros((n, capacidad), dtype=np.bool_)
+        self.e_vision = np.zeros((n, capacidad), dtype=np.int32)
+        self.e_cadencia = np.zeros((n, capacidad), dtype=np.int32)
+        self.e_ultimo = np.zeros((n, capacidad), dtype=np.int32)
+        self.e_udx = np.zeros((n, capacidad), dtype=np.int32)
+        self.e_udy = np.zeros((n, capacidad), dtype=np.int32)
+
+    def _reservar_cofres(self, capacidad):
+        n = self.n
+        self.cx = np.zeros((n, capacidad), dtype=np.int32)
+        self.cy = np.zeros((n, capacidad), dtype=np.int32)
+        self.c_contenido = np.zeros((n, capacidad), dtype=np.int8)
+        self.c_valor = np.zeros((n, capacidad), dtype=np.int32)
+        self.c_cerrado = np.zeros((n, capacidad), dtype=np.bool_)   # existe y sin abrir
+
+    def _ampliar(self, nombres, capacidad):
+        for nombre in nombres:
+            viejo = getattr(self, nombre)
+            nuevo = np.zeros((self.n, capacidad), dtype=viejo.dtype)
+            nuevo[:, :viejo.shape[1]] = viejo
+            setattr(self, nombre, nuevo)
+
+    def _semilla_mapa(self, i):
+        if self.semilla is None:
+            return int(self._rng.integers(2 ** 63))
+        return ((self.semilla * 1000003 + i) * 1000003 + int(self.episodios[i])) % 2 ** 63
+
+    def reiniciar(self, indices):
+        """Empieza un mapa nuevo en las partidas `indices`."""
+        if self._reserva is not None:
+            indices = np.asarray(indices)
+            origen = self._rng.integers(self._reserva.n, size=len(indices))
+            for nombre in _CAMPOS_PARTIDA + _CAMPOS_ENEMIGOS + _CAMPOS_COFRES:
+                getattr(self, nombre)[indices] = getattr(self._reserva, nombre)[origen]
+            self.terminado[indices] = False
+            self.victoria[indices] = False
+            self.episodios[indices] += 1
+            return
+        for i in np.asarray(indices).tolist():
+            mapa = Mapa(self.filas, self.columnas, seed=self._semilla_mapa(i),
+                        backend=self.backend, generador=self.generador)
+            mapa.generar_mapa()
+            self.cargar_mapa(i, mapa)
+            self.episodios[i] += 1
+
+    def cargar_mapa(self, i, mapa):
+        """Copia a la partida `i` el estado de un Mapa ya generado."""
+        codigos = np.frombuffer(codigos_terreno(mapa.base_matriz), dtype=np.uint8)
+        self.paso[i] = TABLA_PASO_NP[codigos].reshape(self.filas, self.columnas)
+        self.portal[i] = mapa.portal
+        j = mapa.jugador
+        self.jx[i], self.jy[i], self.movimientos[i] = j.x, j.y, j.movimientos
+        self.corazones_totales[i], self.corazones_llenos[i] = j.corazones_totales, j.corazones_llenos
+        self.armaduras[i], self.espadas[i], self.puntuacion[i] = j.armaduras, j.espadas, j.puntuacion
+
+        if len(mapa.enemigos) > self.ex.shape[1]:
+            self._ampliar(_CAMPOS_ENEMIGOS, len(mapa.enemigos))
+        k = len(mapa.enemigos)
+        self.e_vivo[i] = False
+        if k:
+            (self.ex[i, :k], self.ey[i, :k], self.e_vision[i, :k], self.e_cadencia[i, :k], self.e_ultimo[i, :k],
+             self.e_udx[i, :k], self.e_udy[i, :k]) = zip(*((e.x, e.y, e.vision, e.cadencia, e.ultimo_movimiento,
+                                                             e.ultimo_dx, e.ultimo_dy) for e in mapa.enemigos))
+            self.e_vivo[i, :k] = True
+
+        if len(mapa.cofres) > self.cx.shape[1]:
+            self._ampliar(_CAMPOS_COFRES, len(mapa.cofres))
+        k = len(mapa.cofres)
+        self.c_cerrado[i] = False
+        if k:
+            (self.cx[i, :k], self.cy[i, :k], self.c_contenido[i, :k], self.c_valor[i, :k],
+             self.c_cerrado[i, :k]) = zip(*((c.x, c.y, c.codigo, c.valor, not c.abierto)
+                                            for c in mapa.cofres))
+        self.terminado[i] = False
+        self.victoria[i] = False
+
+    # ===================== Reglas =====================
+    def _transitable(self, partidas, x, y):
+        """paso[partida, x, y] con comprobación de límites (arrays de igual forma)."""
+        dentro = (x >= 0) & (x < self.filas) & (y >= 0) & (y < self.columnas)
+        return dentro & self.paso[partidas, np.clip(x, 0, self.filas - 1), np.clip(y, 0, self.columnas - 1)]
+
+    def _campos_flujo(self, partidas):
+        """Distancias BFS al jugador en la ventana de flujo.CampoFlujo, (k, filas, columnas).
+
+        Frente de onda sobre todas las `partidas` a la vez: -1 fuera de la
+        ventana o sin camino dentro de ella.
+        """
+        filas, columnas = self.filas, self.columnas
+        radio = ENEMY_FLOW_RADIUS
+        k = len(partidas)
+        jx = self.jx[partidas]
+        jy = self.jy[partidas]
+        xs = np.arange(filas)[None, :, None]
+        ys = np.arange(columnas)[None, None, :]
+        ventana = (self.paso[partidas]
+                   & (np.abs(xs - jx[:, None, None]) <= radio)
+                   & (np.abs(ys - jy[:, None, None]) <= radio))
+        dist = np.full((k, filas, columnas), -1, dtype=np.int32)
+        frente = np.zeros((k, filas, columnas), dtype=np.bool_)
+        frente[np.arange(k), jx, jy] = True
+        dist[frente] = 0
+        d = 0
+        while frente.any():
+            d += 1
+            vecinas = np.zeros_like(frente)
+            vecinas[:, 1:, :] |= frente[:, :-1, :]
+            vecinas[:, :-1, :] |= frente[:, 1:, :]
+            vecinas[:, :, 1:] |= frente[:, :, :-1]
+            vecinas[:, :, :-1] |= frente[:, :, 1:]
+            frente = vecinas & ventana & (dist < 0)
+            dist[frente] = d
+        return dist
+
+    def _bajar_por_campos(self, persigue, edx, edy):
+        """Paso de cada enemigo que persigue por el campo de su partida (ver Enemigo)."""
+        pasos_x = np.zeros(self.ex.shape, dtype=np.int32)
+        pasos_y = np.zeros(self.ex.shape, dtype=np.int32)
+        mueve = np.zeros(self.ex.shape, dtype=np.bool_)
+        cuales = np.flatnonzero(persigue.any(axis=1))
+        if not len(cuales):
+            return mueve, pasos_x, pasos_y
+        dist = self._campos_flujo(cuales)
+        filas, columnas = self.filas, self.columnas
+        locales = np.broadcast_to(np.arange(len(cuales))[:, None], (len(cuales), self.ex.shape[1]))
+        ex, ey = self.ex[cuales], self.ey[cuales]
+
+        def distancia(x, y):
+            dentro = (x >= 0) & (x < filas) & (y >= 0) & (y < columnas)
+            valor = dist[locales, np.clip(x, 0, filas - 1), np.clip(y, 0, columnas - 1)]
+            return np.where(dentro, valor, -1)
+
+        d0 = distancia(ex, ey)
+        pendiente = persigue[cuales] & (d0 > 0)
+        px = np.zeros(ex.shape, dtype=np.int32)
+        py = np.zeros(ex.shape, dtype=np.int32)
+        hecho = np.zeros(ex.shape, dtype=np.bool_)
+        candidatos = [(edx[cuales], edy[cuales])] + [(np.full(ex.shape, a, np.int32), np.full(ex.shape, b, np.int32))
+                                                     for a, b in DIRECCIONES]
+        for cdx, cdy in candidatos:
+            elige = pendiente & ~hecho & (distancia(ex + cdx, ey + cdy) == d0 - 1)
+            px = np.where(elige, cdx, px)
+            py = np.where(elige, cdy, py)
+            hecho |= elige
+        mueve[cuales] = hecho
+        pasos_x[cuales] = px
+        pasos_y[cuales] = py
+        return mueve, pasos_x, pasos_y
+
+    def step(self, acciones):
+        """Aplica una acción a cada partida; devuelve un dict de arrays (n,) por evento.
+
+        Claves: 'movido', y los tipos de evento de simulacion.py COFRE,
+        ESPADA, EMPUJON y CORAZON (cuántos hubo) y DERROTA y PORTAL, más
+        'terminado' (la partida acabó en este paso y ya se reinició).
+        """
+        n = self.n
+        todas = np.arange(n)
+        d = _DESPLAZAMIENTOS[np.asarray(acciones, dtype=np.intp)]
+
+        # --- Jugador ---
+        nx = self.jx + d[:, 0]
+        ny = self.jy + d[:, 1]
+        movido = ((d[:, 0] != 0) | (d[:, 1] != 0)) & self._transitable(todas, nx, ny)
+        self.jx = np.where(movido, nx, self.jx)
+        self.jy = np.where(movido, ny, self.jy)
+        self.movimientos += movido
+
+        # --- Enemigos: persecución cada `cadencia` movimientos del jugador ---
+        jx = self.jx[:, None]
+        jy = self.jy[:, None]
+        dist_x = jx - self.ex
+        dist_y = jy - self.ey
+        persigue = (movido[:, None] & self.e_vivo
+                    & (self.movimientos[:, None] - self.e_ultimo >= self.e_cadencia)
+                    & (np.abs(dist_x) <= self.e_vision) & (np.abs(dist_y) <= self.e_vision))
+        por_x = np.abs(dist_x) > np.abs(dist_y)
+        edx = np.where(por_x, np.sign(dist_x), 0).astype(np.int32)
+        edy = np.where(por_x, 0, np.where(dist_y > 0, 1, -1)).astype(np.int32)
+        partidas = np.broadcast_to(todas[:, None], self.ex.shape)
+        if ENEMY_PATHFINDING == 'flujo':
+            mueve, edx, edy = self._bajar_por_campos(persigue, edx, edy)
+        else:
+            mueve = persigue & self._transitable(partidas, self.ex + edx, self.ey + edy)
+        self.ex += np.where(mueve, edx, 0)
+        self.ey += np.where(mueve, edy, 0)
+        self.e_ultimo = np.where(mueve, self.movimientos[:, None], self.e_ultimo)
+        self.e_udx = np.where(mueve, edx, self.e_udx)
+        self.e_udy = np.where(mueve, edy, self.e_udy)
+
+        # --- Cofre: el primero sin abrir bajo el jugador ---
+        en_cofre = self.c_cerrado & (self.cx == jx) & (self.cy == jy) & movido[:, None]
+        abre = en_cofre.any(axis=1)
+        cual = en_cofre.argmax(axis=1) if en_cofre.shape[1] else np.zeros(n, dtype=np.intp)
+        if abre.any():
+            i = np.flatnonzero(abre)
+            k = cual[i]
+            self.c_cerrado[i, k] = False
+            contenido = self.c_contenido[i, k]
+            self.armaduras[i] += contenido == OBJETO_ARMADURA
+            self.espadas[i] += contenido == OBJETO_ESPADA
+            self.puntuacion[i] += np.where(contenido == OBJETO_DINERO, self.c_valor[i, k], 0)
+
+        # --- Choques: enemigo a enemigo, en orden, como Simulacion ---
+        espadazos = np.zeros(n, dtype=np.int32)
+        empujones = np.zeros(n, dtype=np.int32)
+        corazones = np.zeros(n, dtype=np.int32)
+        derrota = np.zeros(n, dtype=np.bool_)
+        pendientes = self.e_vivo & (self.ex == jx) & (self.ey == jy) & movido[:, None]
+        while True:
+            quedan = pendientes.any(axis=1) & ~derrota
+            if not quedan.any():
+                break
+            i = np.flatnonzero(quedan)
+            k = pendientes[i].argmax(axis=1)
+            pendientes[i, k] = False
+
+            con_espada = self.espadas[i] > 0
+            a = i[con_espada]
+            self.espadas[a] -= 1
+            self.e_vivo[a, k[con_espada]] = False
+            espadazos[a] += 1
+
+            con_armadura = ~con_espada & (self.armaduras[i] > 0)
+            b, kb = i[con_armadura], k[con_armadura]
+            self.armaduras[b] -= 1
+            empujado = self._empujar(b, kb)
+            empujones[b[empujado]] += 1
+
+            pierde = i[~con_espada & ~con_armadura]
+            pierde = np.concatenate((pierde, b[~empujado]))
+            corazones[pierde] += 1
+            self.corazones_llenos[pierde] = np.maximum(self.corazones_llenos[pierde] - 1, 0)
+            derrota[pierde] |= self.corazones_llenos[pierde] == 0
+
+        # --- Portal ---
+        portal = movido & (self.jx == self.portal[:, 0]) & (self.jy == self.portal[:, 1])
+
+        terminado = derrota | portal
+        self.terminado |= terminado
+        self.victoria |= portal & ~derrota
+        resultado = {'movido': movido, COFRE: abre, ESPADA: espadazos, EMPUJON: empujones,
+                     CORAZON: corazones, DERROTA: derrota, PORTAL: portal, 'terminado': terminado}
+        if terminado.any():
+            self.reiniciar(np.flatnonzero(terminado))
+        return resultado
+
+    def _empujar(self, partidas, huecos):
+        """Empuja 2 casillas hacia atrás a los enemigos (partidas[i], huecos[i]).
+
+        Devuelve la máscara de los que se pudieron mover.
+        """
+        ex = self.ex[partidas, huecos]
+        ey = self.ey[partidas, huecos]
+        dx = self.e_udx[partidas, huecos]
+        dy = self.e_udy[partidas, huecos]
+        quieto = (dx == 0) & (dy == 0)
+        # Sin último paso: alejarse del jugador (está en su misma casilla, así que no hay hacia dónde)
+        dx = np.where(quieto, np.sign(ex - self.jx[partidas]), dx)
+        dy = np.where(quieto, np.sign(ey - self.jy[partidas]), dy)
+        dx, dy = -dx, -dy
+        final_x, final_y = ex.copy(), ey.copy()
+        sigue = np.ones(len(partidas), dtype=np.bool_)
+        for paso in (1, 2):
+            ok = sigue & self._transitable(partidas, ex + dx * paso, ey + dy * paso)
+            final_x = np.where(ok, ex + dx * paso, final_x)
+            final_y = np.where(ok, ey + dy * paso, final_y)
+            sigue = ok
+        movido = (final_x != ex) | (final_y != ey)
+        self.ex[partidas, huecos] = final_x
+        self.ey[partidas, huecos] = final_y
+        return movido
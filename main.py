@@ -1,7 +1,31 @@
 # Punto de entrada del juego
+#
+#   python main.py                          jugar
+#   python main.py --grabar partida.rep     jugar grabando una repetición
+#   python main.py --repetir partida.rep    reproducirla sin ventana, a toda velocidad
+#   python main.py --repetir partida.rep --tiempo-real
+
+import argparse
 
 from juego import Juego
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Aventura por mapas aleatorios.")
+    parser.add_argument('--semilla', type=int, default=None, help="semilla de los mapas de la partida")
+    parser.add_argument('--grabar', metavar='RUTA', help="grabar la partida en una repetición")
+    parser.add_argument('--repetir', metavar='RUTA', help="reproducir una repetición")
+    parser.add_argument('--tiempo-real', action='store_true',
+                        help="reproducir mostrando la partida al ritmo de REPLAY_SPEED")
+    args = parser.parse_args()
+
+    juego = Juego(semilla=args.semilla)
+    if args.repetir:
+        acciones = juego.reproducir(args.repetir, tiempo_real=args.tiempo_real)
+        print(f"Repetición correcta: {acciones} acciones, nivel {juego.nivel}.")
+    else:
+        juego.iniciar(grabar=args.grabar)
+
+
 if __name__ == "__main__":
-    juego = Juego()
-    juego.iniciar()
+    main()
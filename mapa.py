@@ -3,33 +3,92 @@
 # y dificultad progresiva basada en el tamaño del mapa (relacionado con el nivel).
 #
 # Compatibilidad: mantiene la interfaz usada por juego.py
-#   - Mapa(filas, columnas)
+#   - Mapa(filas, columnas)  (backend opcional: 'lista' o 'numpy', ver terreno.py;
+#     generador opcional: 'ruido', 'cuevas' o 'bsp', ver generadores.py)
 #   - generar_mapa()
-#   - revelar_area(x, y, radio)
-#   - atributos: base_matriz, revelado, jugador, enemigos, cofres, portal
+#   - revelar_area(x, y, radio[, dx, dy])
+#   - atributos: base_matriz, revelado (Niebla, ver niebla.py), jugador, enemigos, cofres, portal
+#   - consultas por posición: enemigos_en, cofre_en, *_en_rectangulo (ver indice_espacial.py)
 
 import random
-from collections import deque
+from bisect import bisect_left
 from entidades import Personaje, Enemigo, Cofre
-from config import VISIBLE_RADIUS
+from bfs import MotorBFS, etiquetar_componentes
+from generadores import obtener_generador
+from generacion_paralela import generar_terreno_paralelo
+from colocacion import RejillaSeparacion, muestrear_separadas, completar
+from config import VISIBLE_RADIUS, TERRAIN_BACKEND, TERRAIN_GENERATOR, FOV_MODE
+from config import PARALLEL_TILE_SIZE, PARALLEL_WORKERS
+from config import ENEMY_FLOW_RADIUS, ENEMY_TABLE_MIN
+from config import ENEMY_PLAYER_MIN_DIST, ENEMY_ENEMY_MIN_DIST, CHEST_CHEST_MIN_DIST
+from niebla import Niebla
+from serializacion import semilla_u64
+from indice_espacial import IndiceEspacial
+from planificador import RuedaTurnos
+from flujo import CampoFlujo
+from tabla_enemigos import TablaEnemigos
+from vision import CampoVision, estencil_disco, estencil_delta, celdas_estencil
+from terreno import GrillaTerreno, CELDAS_TRANSITABLES, crear_base_matriz, np
 
 class Mapa:
-    def __init__(self, filas, columnas, seed=None):
+    def __init__(self, filas, columnas, seed=None, backend=None, modo_vision=None, generador=None,
+                 paralelo=False, base_matriz=None, revelado=None):
+        """`base_matriz` y `revelado` dan un terreno y una niebla ya hechos (p. ej.
+        vistas de una partida, ver partida.py) en lugar de crearlos vacíos.
+        """
         self.filas = filas
         self.columnas = columnas
-        self.base_matriz = [[' ' for _ in range(columnas)] for _ in range(filas)]
-        self.revelado = [[False for _ in range(columnas)] for _ in range(filas)]
+        # La generación por teselas en paralelo escribe directamente la grilla uint8
+        self.paralelo = paralelo
+        self.backend = 'numpy' if paralelo else (backend or TERRAIN_BACKEND)
+        self.generador = generador or TERRAIN_GENERATOR
+        # Reducida a u64: es la que se guarda en partidas y paquetes de niveles
+        self.seed = semilla_u64(seed)
+        if base_matriz is None:
+            base_matriz = crear_base_matriz(filas, columnas, self.backend)
+        if revelado is None:
+            revelado = Niebla(filas, columnas)
+        self.base_matriz = base_matriz
+        self.revelado = revelado
+        # mmap de la partida cargada sobre el que están base_matriz y revelado
+        self.respaldo = None
+        self.modo_vision = modo_vision or FOV_MODE
+        self.campo_vision = CampoVision(self._es_opaca, filas, columnas)
+        self.campo_flujo = CampoFlujo(self._es_opaca, filas, columnas, ENEMY_FLOW_RADIUS)
         self.jugador = None
         self.enemigos = []
         self.cofres = []
         self.portal = None
-        if seed is not None:
-            random.seed(seed)
+        # Índices por posición: enemigos vivos y cofres sin abrir
+        self.indice_enemigos = IndiceEspacial(columnas)
+        self.indice_cofres = IndiceEspacial(columnas)
+        self._tabla_enemigos = None
+        # Historial que sigue los cambios del mapa (lo fija Historial.reiniciar)
+        self.historial = None
+        # Activación: sólo se mueven los enemigos cercanos al jugador (ver enemigos_despiertos)
+        self._despiertos = None
+        self._region = None
+        self._anillos = 1
+        # Turno en que le toca actuar a cada enemigo despierto (ver enemigos_en_turno)
+        self._rueda = RuedaTurnos()
+        self._programados = set()
+        self._despiertos_programados = None
+        self._conjunto_despiertos = set()
+        self._motor_bfs = None
+        self.estadisticas = {}
+        # RNG propio: el mapa no toca el estado global de random, así que la
+        # misma semilla da siempre el mismo mapa (y se puede cachear)
+        self.rng = random.Random(self.seed)
 
     # ===================== API principal =====================
     def generar_mapa(self):
         """Genera un mapa aleatorio PERO garantizando que exista camino
         entre el jugador y el portal. Incluye dificultad progresiva.
+
+        El terreno se genera una sola vez: se etiquetan sus regiones de
+        suelo, el jugador empieza en la mayor y, si desde ahí no se llega a
+        la distancia mínima del portal, se cose con otras regiones abriendo
+        el corredor que atraviesa menos muros.
         """
         # Estimamos el nivel a partir del tamaño del mapa que el Juego ya escala.
         # (El juego llama cambiar_mapa(15 + nivel, 15 + nivel))
@@ -40,118 +99,345 @@ class Mapa:
         # Parámetros de dificultad progresiva
         # Menor probabilidad de suelo a mayor nivel => más obstáculos.
         prob_suelo = max(0.50, 0.72 - 0.02 * (nivel_est - 1))  # clamp [0.50, ~0.72]
-        intentos_max = 8  # Intentos de regeneración antes de forzar camino
         min_dist_portal = min(8 + nivel_est, (self.filas + self.columnas) // 2)  # distancia mínima deseada
 
-        cx, cy = self.filas // 2, self.columnas // 2  # centro para comenzar
+        cx, cy = self.filas // 2, self.columnas // 2  # centro de referencia
+        motor = self._motor()
 
-        exito = False
-        for _ in range(intentos_max):
-            self._generar_terreno(prob_suelo)
-            # Asegurar que el centro sea transitable
-            self.base_matriz[cx][cy] = '.'
-            self.jugador = Personaje(cx, cy)
-
-            # Celdas alcanzables desde el jugador
-            alcanzables, dist = self._alcanzables_desde((cx, cy))
-            if not alcanzables:
-                continue  # Terreno demasiado bloqueado, intentar de nuevo
-
-            # Elegir portal: preferimos celdas muy lejanas y alcanzables
-            portal = self._elegir_portal(alcanzables, dist, min_dist=min_dist_portal)
-            if portal is None:
-                # Tomar la celda más lejana alcanzable
-                portal = max(alcanzables, key=lambda p: dist[p])
-
-            px, py = portal
-            self.base_matriz[px][py] = 'S'
-            self.portal = (px, py)
-
-            # Recalcular alcanzables incluyendo el portal (no necesario para camino, pero útil)
-            alcanzables, dist = self._alcanzables_desde((cx, cy))
-            if (px, py) not in alcanzables:
-                # Algo falló (no hay camino), reintentar
-                continue
-
-            # Colocar entidades sólo en celdas alcanzables
-            self._colocar_entidades(alcanzables, jugador=(cx, cy), portal=(px, py), nivel=nivel_est)
-
-            # Revelar área inicial
-            self.revelar_area(cx, cy, VISIBLE_RADIUS)
-            exito = True
-            break
-
-        if not exito:
-            # Último recurso: forzar un camino en forma de corredor L hacia una esquina lejana
-            self._generar_terreno(prob_suelo)
+        self._generar_terreno(prob_suelo)
+        paso = self._mascara_paso()
+
+        # Regiones de suelo: el jugador empieza en la mayor, cerca del centro
+        etiquetas, tamanos = etiquetar_componentes(paso, self.filas, self.columnas)
+        inicio = self._inicio_en_mayor_region(etiquetas, tamanos, motor.indice(cx, cy))
+        if inicio is None:
+            # Mapa sin suelo: abrir el centro
+            inicio = motor.indice(cx, cy)
             self.base_matriz[cx][cy] = '.'
-            self.jugador = Personaje(cx, cy)
-            esquina = self._esquina_mas_lejana(cx, cy)
-            px, py = esquina
-            self._carvar_camino((cx, cy), (px, py))
-            self.base_matriz[px][py] = 'S'
-            self.portal = (px, py)
-            alcanzables, _ = self._alcanzables_desde((cx, cy))
-            self._colocar_entidades(alcanzables, jugador=(cx, cy), portal=(px, py), nivel=nivel_est)
-            self.revelar_area(cx, cy, VISIBLE_RADIUS)
-
-    def revelar_area(self, x, y, radio):
-        r2 = radio * radio
-        for i in range(max(0, x - radio), min(self.filas, x + radio + 1)):
-            for j in range(max(0, y - radio), min(self.columnas, y + radio + 1)):
-                dx = x - i
-                dy = y - j
-                if dx * dx + dy * dy <= r2:
-                    self.revelado[i][j] = True
+            paso[inicio] = 1
+        jx, jy = motor.celda(inicio)
+        self.jugador = Personaje(jx, jy)
+        # Métricas de la generación (generar_niveles.py las vuelca por nivel).
+        # 'reintentos' queda siempre en 0: el terreno ya no se regenera.
+        self.estadisticas = {'nivel': nivel_est, 'prob_suelo': prob_suelo, 'reintentos': 0,
+                             'celdas_cosidas': 0, 'corredor_l': False}
+
+        motor.explorar(paso, (inicio,))
+        if motor.dist[motor.orden[motor.alcanzados - 1]] < min_dist_portal:
+            # Región demasiado corta: coser regiones hasta alguna celda a la
+            # distancia mínima (Manhattan, que acota el camino por abajo)
+            columnas = self.columnas
+
+            def lejos(idx):
+                return abs(idx // columnas - jx) + abs(idx % columnas - jy) >= min_dist_portal
+
+            camino = motor.corredor_minimo(paso, inicio, lejos)
+            if camino is not None:
+                self.estadisticas['celdas_cosidas'] = self._abrir_celdas(camino, paso)
+            else:
+                # Último recurso (mapa diminuto): corredor en L hacia la esquina más lejana
+                esquina = self._esquina_mas_lejana(jx, jy)
+                self._carvar_camino((jx, jy), esquina)
+                self.estadisticas['corredor_l'] = True
+                paso = self._mascara_paso()
+            motor.explorar(paso, (inicio,))
+
+        # Elegir portal: preferimos celdas muy lejanas y alcanzables
+        portal = self._elegir_portal(motor, min_dist=min_dist_portal)
+        if portal is None:
+            # Tomar la celda más lejana alcanzable (la última en orden BFS)
+            portal = motor.orden[motor.alcanzados - 1]
+
+        # El portal 'S' sigue siendo transitable: las distancias no cambian
+        px, py = motor.celda(portal)
+        self.base_matriz[px][py] = 'S'
+        self.portal = (px, py)
+        self.estadisticas['area_alcanzable'] = motor.alcanzados
+        self.estadisticas['distancia_portal'] = motor.dist[portal]
+
+        # Colocar entidades sólo en celdas alcanzables
+        self._colocar_entidades(motor, jugador=(jx, jy), portal=(px, py), nivel=nivel_est)
+        self.estadisticas['enemigos'] = len(self.enemigos)
+        self.estadisticas['cofres'] = len(self.cofres)
+        self.indexar_entidades()
+
+        # Revelar área inicial
+        self.terreno_modificado()
+        self.revelar_area(jx, jy, VISIBLE_RADIUS)
+
+    def revelar_area(self, x, y, radio, dx=0, dy=0):
+        """Revela el círculo de radio `radio` centrado en (x, y).
+
+        Si se indica el paso (dx, dy) con el que se llegó a (x, y), sólo se
+        aplican las celdas que entran en el círculo con ese movimiento.
+        Devuelve la lista de celdas (x, y) que se revelaron por primera vez.
+        En modo 'sombras' se revela lo que hay en línea de visión (el paso
+        no se usa: el conjunto visible sale de la caché del campo de visión).
+        """
+        if self.modo_vision == 'sombras':
+            return self.revelado.revelar_varias(self.campo_vision.visibles(x, y, radio))
+        if dx or dy:
+            estencil = estencil_delta(radio, dx, dy)
+        else:
+            estencil = estencil_disco(radio)
+        return self.revelado.revelar_varias(celdas_estencil(x, y, estencil, self.filas, self.columnas))
+
+    def linea_de_vision(self, x0, y0, x1, y1, radio):
+        """Indica si (x0, y0) ve a (x1, y1) dentro de `radio` respetando muros.
+
+        Las sombras son simétricas entre celdas de suelo, así que se consulta
+        el campo visible desde (x1, y1): todos los enemigos que buscan al
+        jugador comparten un único cálculo cacheado por radio.
+        """
+        return (x0, y0) in self.campo_vision.visibles(x1, y1, radio)
+
+    def eliminar_enemigo(self, enemigo):
+        self.enemigos.remove(enemigo)
+        self.indice_enemigos.quitar(enemigo)
+        self._despiertos = None
+        if self._tabla_enemigos is not None:
+            self._tabla_enemigos.invalidar()
+        if self.historial is not None:
+            self.historial.enemigo_eliminado()
+
+    def enemigos_despiertos(self):
+        """Enemigos que pueden moverse este turno; el resto duerme.
+
+        Un enemigo sólo persigue si el jugador está a `vision` casillas o
+        menos, así que basta con los de los cubos de indice_enemigos
+        alrededor del cubo del jugador. La lista se rehace cuando el jugador
+        entra en otro cubo o un enemigo cambia de cubo, de modo que el coste
+        por turno depende de los enemigos cercanos y no del total.
+        """
+        j = self.jugador
+        region = self.indice_enemigos.cubo(j.x, j.y)
+        if self._despiertos is None or region != self._region:
+            self._region = region
+            self._despiertos = self.indice_enemigos.en_cubos(region[0], region[1], self._anillos)
+        return self._despiertos
+
+    def enemigos_en_turno(self, turno):
+        """Enemigos despiertos que pueden moverse en el turno `turno`.
+
+        Cada enemigo despierto está en la rueda de turnos en el primer turno
+        en que podría moverse (Enemigo.turno_despertar); los demás no se
+        miran. Tras moverlos hay que llamar a reprogramar_enemigos().
+        """
+        rueda = self._rueda
+        if rueda.turno is None or turno != rueda.turno + 1:
+            # Deshacer, cargar o primer turno: se programa todo de nuevo
+            rueda.vaciar(turno - 1)
+            self._programados.clear()
+            self._despiertos_programados = None
+        despiertos = self.enemigos_despiertos()
+        if despiertos is not self._despiertos_programados:
+            # Cambió la zona despierta: se apuntan los que acaban de despertar
+            self._despiertos_programados = despiertos
+            self._conjunto_despiertos = set(despiertos)
+            j = self.jugador
+            for e in despiertos:
+                if e not in self._programados:
+                    self._programados.add(e)
+                    rueda.programar(e, e.turno_despertar(j, turno))
+        actuan = []
+        for e in rueda.avanzar(turno):
+            if e in self._conjunto_despiertos:
+                actuan.append(e)
+            else:
+                self._programados.discard(e)  # se durmió o murió; se apunta al despertar
+        return actuan
+
+    def reprogramar_enemigos(self, enemigos, turno):
+        """Vuelve a apuntar en la rueda a los `enemigos` que actuaron en `turno`."""
+        j = self.jugador
+        for e in enemigos:
+            self._rueda.programar(e, e.turno_despertar(j, turno + 1))
+
+    def tabla_enemigos(self):
+        """TablaEnemigos para mover a los despiertos en bloque, o None si no compensa."""
+        if np is None or ENEMY_TABLE_MIN is None or len(self.enemigos_despiertos()) < ENEMY_TABLE_MIN:
+            return None
+        if self._tabla_enemigos is None:
+            self._tabla_enemigos = TablaEnemigos(self)
+        return self._tabla_enemigos
+
+    # ===================== Entidades por posición =====================
+    def indexar_entidades(self):
+        """Rehace los índices espaciales tras sustituir enemigos o cofres."""
+        self.indice_enemigos.vaciar()
+        for e in self.enemigos:
+            self.indice_enemigos.agregar(e)
+        # Anillos de cubos que cubren la visión del enemigo que más ve
+        lado = self.indice_enemigos.lado
+        self._anillos = max(1, -(-max((e.vision for e in self.enemigos), default=0) // lado))
+        self._despiertos = None
+        self._rueda.vaciar()
+        self.indice_cofres.vaciar()
+        for c in self.cofres:
+            if not c.abierto:
+                self.indice_cofres.agregar(c)
+        if self._tabla_enemigos is not None:
+            self._tabla_enemigos.invalidar()
+
+    def enemigo_movido(self, enemigo, x0, y0):
+        """Avisa de que `enemigo` se movió desde (x0, y0)."""
+        if self.indice_enemigos.mover(enemigo, x0, y0):
+            self._despiertos = None
+        if self._tabla_enemigos is not None:
+            self._tabla_enemigos.enemigo_movido(enemigo)
+        if self.historial is not None:
+            self.historial.enemigo_movido(enemigo)
+
+    def abrir_cofre(self, cofre):
+        cofre.abierto = True
+        self.indice_cofres.quitar(cofre)
+        if self.historial is not None:
+            self.historial.cofre_abierto()
+
+    def enemigos_en(self, x, y):
+        """Enemigos en (x, y), en el orden de la lista de enemigos."""
+        encontrados = self.indice_enemigos.en_celda(x, y)
+        if len(encontrados) > 1:
+            encontrados.sort(key=self.enemigos.index)
+        return encontrados
+
+    def cofre_en(self, x, y):
+        """Cofre sin abrir en (x, y), o None."""
+        encontrados = self.indice_cofres.en_celda(x, y)
+        return encontrados[0] if encontrados else None
+
+    def enemigos_en_rectangulo(self, x0, y0, x1, y1):
+        return self.indice_enemigos.en_rectangulo(x0, y0, x1, y1)
+
+    def cofres_en_rectangulo(self, x0, y0, x1, y1):
+        """Cofres sin abrir en [x0, x1) x [y0, y1)."""
+        return self.indice_cofres.en_rectangulo(x0, y0, x1, y1)
+
+    def cerrar(self):
+        """Libera recursos externos del mapa: el mmap de respaldo (ver también MundoChunks)."""
+        if self.respaldo is None:
+            return
+        # Sin las vistas que apuntan al mmap se puede cerrar ya y no al recolectarlo
+        self.base_matriz = self.revelado = None
+        respaldo, self.respaldo = self.respaldo, None
+        try:
+            respaldo.close()
+        except BufferError:
+            pass  # aún queda alguna vista viva: se cierra al liberarla
+
+    def soltar_respaldo(self):
+        """Copia a memoria propia el terreno y la niebla del mmap de respaldo y lo cierra."""
+        if self.respaldo is None:
+            return
+        if isinstance(self.base_matriz, GrillaTerreno):
+            base_matriz = GrillaTerreno.desde_codigos(self.base_matriz.codigos.copy())
+        else:
+            base_matriz = self.base_matriz   # el backend 'lista' ya no depende del mmap
+        niebla = self.revelado
+        revelado = Niebla.sobre_buffer(self.filas, self.columnas, bytearray(niebla.bits), niebla.explorado)
+        self.cerrar()
+        self.base_matriz, self.revelado = base_matriz, revelado
+
+    def terreno_modificado(self):
+        """Avisa de que base_matriz cambió: invalida las cachés de visión y de distancias."""
+        self.campo_vision.invalidar()
+        self.campo_flujo.invalidar()
+        if self._tabla_enemigos is not None:
+            self._tabla_enemigos.terreno_modificado()
+
+    def porcentaje_explorado(self):
+        """Porcentaje del mapa ya revelado (O(1), lo lleva la niebla)."""
+        return self.revelado.porcentaje_explorado()
 
     # ===================== Utilidades internas =====================
     def _generar_terreno(self, prob_suelo: float):
-        """Rellena el mapa con suelo '.' según una probabilidad y el resto como muros ' '."""
-        for i in range(self.filas):
-            fila = self.base_matriz[i]
-            for j in range(self.columnas):
-                fila[j] = '.' if random.random() < prob_suelo else ' '
+        """Rellena base_matriz con el generador de terreno del mapa (ver generadores.py)."""
+        if self.paralelo:
+            semilla = self.seed if self.seed is not None else self.rng.getrandbits(64)
+            self.base_matriz = generar_terreno_paralelo(self.filas, self.columnas, prob_suelo, semilla,
+                                                        self.generador, PARALLEL_TILE_SIZE, PARALLEL_WORKERS)
+            return
+        obtener_generador(self.generador)(self, prob_suelo, self.rng)
+
+    def _motor(self):
+        """Motor BFS del mapa (los búferes se reservan una sola vez)."""
+        if self._motor_bfs is None:
+            self._motor_bfs = MotorBFS(self.filas, self.columnas)
+        return self._motor_bfs
+
+    def _mascara_paso(self):
+        """bytearray plano con 1 en las celdas transitables (para MotorBFS)."""
+        if isinstance(self.base_matriz, GrillaTerreno):
+            return bytearray(self.base_matriz.mascara_transitable().tobytes())
+        return bytearray(c in CELDAS_TRANSITABLES for fila in self.base_matriz for c in fila)
+
+    def _inicio_en_mayor_region(self, etiquetas, tamanos, preferida):
+        """Índice de la celda de la mayor región más cercana a `preferida`
+        (distancia Manhattan). None si el mapa no tiene suelo.
+        """
+        if not tamanos:
+            return None
+        mayor = max(range(len(tamanos)), key=tamanos.__getitem__)
+        if etiquetas[preferida] == mayor:
+            return preferida
+        px, py = divmod(preferida, self.columnas)
+        mejor, mejor_dist = None, None
+        idx = etiquetas.index(mayor)
+        for idx in range(idx, len(etiquetas)):
+            if etiquetas[idx] == mayor:
+                x, y = divmod(idx, self.columnas)
+                d = abs(x - px) + abs(y - py)
+                if mejor_dist is None or d < mejor_dist:
+                    mejor, mejor_dist = idx, d
+        return mejor
+
+    def _abrir_celdas(self, indices, paso):
+        """Convierte en suelo las celdas (índices planos) y actualiza `paso`.
+        Devuelve cuántos muros se abrieron.
+        """
+        abiertas = 0
+        for idx in indices:
+            if not paso[idx]:
+                x, y = divmod(idx, self.columnas)
+                self.base_matriz[x][y] = '.'
+                paso[idx] = 1
+                abiertas += 1
+        return abiertas
 
     def _alcanzables_desde(self, inicio):
         """BFS que devuelve el conjunto de celdas '.' alcanzables desde inicio
         y un diccionario con distancia en pasos.
+
+        Se mantiene por compatibilidad; la generación usa MotorBFS directamente.
         """
         si, sj = inicio
         if not self._es_transitable(si, sj):
             return set(), {}
-        visitados = set()
-        dist = {}
-        q = deque([(si, sj)])
-        visitados.add((si, sj))
-        dist[(si, sj)] = 0
-        while q:
-            x, y = q.popleft()
-            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
-                if self._en_limites(nx, ny) and self._es_transitable(nx, ny) and (nx, ny) not in visitados:
-                    visitados.add((nx, ny))
-                    dist[(nx, ny)] = dist[(x, y)] + 1
-                    q.append((nx, ny))
-        return visitados, dist
-
-    def _elegir_portal(self, alcanzables, dist, min_dist=5):
+        motor = self._motor()
+        n = motor.explorar(self._mascara_paso(), (motor.indice(si, sj),))
+        dist = {motor.celda(idx): motor.dist[idx] for idx in motor.orden[:n]}
+        return set(dist), dist
+
+    def _elegir_portal(self, motor, min_dist=5):
         """Elige una celda alcanzable con distancia >= min_dist.
         Prioriza las más lejanas para aumentar el desafío.
+        Devuelve el índice plano de la celda o None.
         """
-        candidatos = [p for p in alcanzables if dist.get(p, 0) >= min_dist]
-        if not candidatos:
+        # motor.orden está ordenado por distancia: los candidatos son un sufijo
+        n = motor.alcanzados
+        primero = bisect_left(motor.orden, min_dist, 0, n, key=motor.dist.__getitem__)
+        if primero >= n:
             return None
         # Seleccionar entre el 25% más lejano
-        candidatos.sort(key=lambda p: dist[p], reverse=True)
-        top = max(1, len(candidatos) // 4)
-        return random.choice(candidatos[:top])
+        top = max(1, (n - primero) // 4)
+        return self.rng.choice(motor.orden[n - top:n])
 
-    def _colocar_entidades(self, alcanzables, jugador, portal, nivel):
+    def _colocar_entidades(self, motor, jugador, portal, nivel):
         """Coloca enemigos y cofres en celdas alcanzables, evitando jugador y portal.
         Escala la cantidad y atributos con el nivel.
         """
-        disponibles = set(alcanzables)
-        disponibles.discard(jugador)
-        disponibles.discard(portal)
+        evitar = (motor.indice(*jugador), motor.indice(*portal))
+        disponibles = [idx for idx in motor.orden[:motor.alcanzados] if idx not in evitar]
         if not disponibles:
             return
 
@@ -168,20 +454,33 @@ class Mapa:
         cofres_max = max(5, area // 45)
         num_cofres = min(cofres_nivel, cofres_max, max(0, len(disponibles) - num_enemigos))
 
+        # Enemigos: sólo a ENEMY_PLAYER_MIN_DIST pasos o más del jugador.
+        # motor.orden está ordenado por distancia BFS: es un sufijo.
+        n = motor.alcanzados
+        primero = bisect_left(motor.orden, ENEMY_PLAYER_MIN_DIST, 0, n, key=motor.dist.__getitem__)
+        lejanas = [idx for idx in motor.orden[primero:n] if idx not in evitar]
+        rejilla = RejillaSeparacion(self.filas, self.columnas, ENEMY_ENEMY_MIN_DIST)
+        elegidos = muestrear_separadas(lejanas, num_enemigos, rejilla, self.columnas, self.rng)
+        # Si la separación no deja sitio, completar primero lejos y luego donde sea
+        elegidos = completar(elegidos, lejanas, num_enemigos, self.rng)
+        elegidos = completar(elegidos, disponibles, num_enemigos, self.rng)
+
         # Colocar enemigos
-        for _ in range(num_enemigos):
-            x, y = random.choice(tuple(disponibles))
-            disponibles.remove((x, y))
+        for idx in elegidos:
+            x, y = motor.celda(idx)
             e = Enemigo(x, y)
             # Dificultad progresiva: aumentar visión con el nivel (tope 9)
             e.vision = min(9, 5 + nivel // 3)
             self.enemigos.append(e)
 
-        # Colocar cofres
-        for _ in range(num_cofres):
-            x, y = random.choice(tuple(disponibles))
-            disponibles.remove((x, y))
-            self.cofres.append(Cofre(x, y))
+        # Colocar cofres (separados entre sí) en las celdas que quedan libres
+        ocupadas = set(elegidos)
+        libres = [idx for idx in disponibles if idx not in ocupadas]
+        rejilla = RejillaSeparacion(self.filas, self.columnas, CHEST_CHEST_MIN_DIST)
+        elegidos = muestrear_separadas(libres, num_cofres, rejilla, self.columnas, self.rng)
+        for idx in completar(elegidos, libres, num_cofres, self.rng):
+            x, y = motor.celda(idx)
+            self.cofres.append(Cofre(x, y, self.rng))
 
     def _carvar_camino(self, origen, destino):
         """Abre un corredor en forma de L desde origen hasta destino garantizando conectividad."""
@@ -204,8 +503,13 @@ class Mapa:
     def _en_limites(self, x, y):
         return 0 <= x < self.filas and 0 <= y < self.columnas
 
+    def _es_opaca(self, x, y):
+        return not (self._en_limites(x, y) and self._es_transitable(x, y))
+
     def _es_transitable(self, x, y):
-        return self.base_matriz[x][y] == '.' or self.base_matriz[x][y] == 'S'
+        if isinstance(self.base_matriz, GrillaTerreno):
+            return self.base_matriz.transitable(x, y)
+        return self.base_matriz[x][y] in CELDAS_TRANSITABLES
 
     # Método legado (para compatibilidad si fuera usado en otro lugar)
     def _posicion_aleatoria_valida(self, lejos_de=None, min_dist=0):
@@ -213,8 +517,8 @@ class Mapa:
         intentos = 200
         while intentos > 0:
             intentos -= 1
-            x = random.randint(0, self.filas - 1)
-            y = random.randint(0, self.columnas - 1)
+            x = self.rng.randint(0, self.filas - 1)
+            y = self.rng.randint(0, self.columnas - 1)
             if self.base_matriz[x][y] == '.':
                 if lejos_de is None:
                     return x, y
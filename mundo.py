@@ -0,0 +1,405 @@
+# Mundo por chunks generados bajo demanda.
+#
+# MundoChunks es un Mapa enorme (CHUNK_WORLD_CHUNKS x CHUNK_WORLD_CHUNKS
+# chunks de CHUNK_SIZE x CHUNK_SIZE celdas) del que sólo se tienen en
+# memoria los chunks usados recientemente. Cada chunk guarda su terreno,
+# su niebla y sus entidades; se genera la primera vez que se toca, de forma
+# determinista a partir de (semilla, chunk), y al salir de la caché LRU se
+# escribe comprimido en disco para recargarlo igual más tarde.
+#
+# base_matriz y revelado son vistas que reparten cada acceso entre chunks,
+# así que revelar_area, celda_transitable, la visión y el render funcionan
+# igual que en Mapa. enemigos y cofres devuelven las entidades de los chunks
+# alrededor del jugador (la zona activa). Los propios chunks hacen de índice
+# espacial: las consultas por posición sólo miran los chunks cercanos.
+#
+# Conectividad: cada chunk abre un puerto en el punto medio de cada borde y
+# lo une a su mayor región (como las teselas de generacion_paralela.py); los
+# puertos de chunks vecinos quedan enfrentados.
+
+import os
+import random
+import shutil
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+
+from bfs import MotorBFS
+from colocacion import RejillaSeparacion, muestrear_separadas, completar
+from config import VISIBLE_RADIUS, TERRAIN_BACKEND, TERRAIN_GENERATOR, FOV_MODE
+from config import CHUNK_SIZE, CHUNK_CACHE, CHUNK_WORLD_CHUNKS, CHUNK_PORTAL_DISTANCE
+from config import ENEMY_FLOW_RADIUS
+from config import ENEMY_PLAYER_MIN_DIST, ENEMY_ENEMY_MIN_DIST, CHEST_CHEST_MIN_DIST
+from entidades import Personaje, Enemigo, Cofre
+from generacion_paralela import Tesela, conectar_puertos, puertos_tesela
+from generadores import obtener_generador
+from mapa import Mapa
+from niebla import Niebla
+from serializacion import (empaquetar_enemigos, desempaquetar_enemigos, empaquetar_cofres, desempaquetar_cofres,
+                           comprobar_codigos, ENEMIGO, COFRE)
+from terreno import CARACTERES, CODIGOS, CELDAS_TRANSITABLES, MURO, SUELO, PORTAL, crear_base_matriz
+from flujo import CampoFlujo
+from vision import CampoVision
+
+# Formato de un chunk en disco (todo comprimido con zlib):
+#   cabecera, terreno (un byte por celda), bits de niebla, enemigos, cofres
+#   (registros de serializacion.py)
+_CABECERA = struct.Struct('<iiIII')      # ci, cj, explorado, n_enemigos, n_cofres
+
+
+class Chunk:
+    def __init__(self, ci, cj, terreno, niebla, enemigos=None, cofres=None):
+        self.ci = ci
+        self.cj = cj
+        self.terreno = terreno              # bytearray de códigos (terreno.py), fila a fila
+        self.niebla = niebla                # Niebla local del chunk
+        self.enemigos = enemigos or []
+        self.cofres = cofres or []
+
+    def a_bytes(self):
+        partes = [_CABECERA.pack(self.ci, self.cj, self.niebla.explorado, len(self.enemigos), len(self.cofres)),
+                  bytes(self.terreno), bytes(self.niebla.bits),
+                  empaquetar_enemigos(self.enemigos), empaquetar_cofres(self.cofres)]
+        return zlib.compress(b''.join(partes))
+
+    @classmethod
+    def desde_bytes(cls, datos, tam):
+        datos = zlib.decompress(datos)
+        if len(datos) < _CABECERA.size:
+            raise ValueError("Chunk guardado incompleto")
+        ci, cj, explorado, n_enemigos, n_cofres = _CABECERA.unpack_from(datos)
+        bytes_niebla = (tam * tam + 7) // 8
+        if len(datos) < (_CABECERA.size + tam * tam + bytes_niebla
+                         + n_enemigos * ENEMIGO.size + n_cofres * COFRE.size):
+            raise ValueError(f"Chunk ({ci}, {cj}) guardado incompleto")
+        pos = _CABECERA.size
+        terreno = bytearray(datos[pos:pos + tam * tam])
+        comprobar_codigos(terreno)
+        pos += tam * tam
+        niebla = Niebla.sobre_buffer(tam, tam, bytearray(datos[pos:pos + bytes_niebla]), explorado)
+        pos += bytes_niebla
+        enemigos, pos = desempaquetar_enemigos(datos, pos, n_enemigos)
+        cofres, pos = desempaquetar_cofres(datos, pos, n_cofres)
+        return cls(ci, cj, terreno, niebla, enemigos, cofres)
+
+
+class AlmacenChunks:
+    """Chunks expulsados de memoria, un fichero comprimido por chunk."""
+
+    def __init__(self, directorio=None):
+        self.temporal = directorio is None
+        self.directorio = directorio or tempfile.mkdtemp(prefix='chunks_')
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, ci, cj):
+        return os.path.join(self.directorio, f"{ci}_{cj}.chunk")
+
+    def guardar(self, chunk):
+        with open(self._ruta(chunk.ci, chunk.cj), 'wb') as f:
+            f.write(chunk.a_bytes())
+
+    def cargar(self, ci, cj, tam):
+        try:
+            with open(self._ruta(ci, cj), 'rb') as f:
+                return Chunk.desde_bytes(f.read(), tam)
+        except FileNotFoundError:
+            return None
+
+    def cerrar(self):
+        if self.temporal:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+# ===================== Vistas estilo lista de listas =====================
+class _FilaTerrenoChunks:
+    __slots__ = ('_mundo', '_x')
+
+    def __init__(self, mundo, x):
+        self._mundo = mundo
+        self._x = x
+
+    def __len__(self):
+        return self._mundo.columnas
+
+    def __getitem__(self, y):
+        chunk, idx = self._mundo._localizar(self._x, y)
+        return CARACTERES[chunk.terreno[idx]]
+
+    def __setitem__(self, y, caracter):
+        chunk, idx = self._mundo._localizar(self._x, y)
+        chunk.terreno[idx] = CODIGOS[caracter]
+
+
+class TerrenoChunks:
+    """base_matriz de un MundoChunks: cada acceso va al chunk que toca."""
+
+    def __init__(self, mundo):
+        self._mundo = mundo
+
+    def __len__(self):
+        return self._mundo.filas
+
+    def __getitem__(self, x):
+        return _FilaTerrenoChunks(self._mundo, x)
+
+
+class _FilaNieblaChunks:
+    __slots__ = ('_niebla', '_x')
+
+    def __init__(self, niebla, x):
+        self._niebla = niebla
+        self._x = x
+
+    def __len__(self):
+        return self._niebla._mundo.columnas
+
+    def __getitem__(self, y):
+        return self._niebla.esta_revelada(self._x, y)
+
+    def __setitem__(self, y, valor):
+        if valor:
+            self._niebla.revelar_varias(((self._x, y),))
+
+
+class NieblaChunks:
+    """revelado de un MundoChunks, repartido en la Niebla de cada chunk."""
+
+    def __init__(self, mundo):
+        self._mundo = mundo
+        self.explorado = 0
+
+    def __len__(self):
+        return self._mundo.filas
+
+    def __getitem__(self, x):
+        return _FilaNieblaChunks(self, x)
+
+    def esta_revelada(self, x, y):
+        chunk, idx = self._mundo._localizar(x, y)
+        return chunk.niebla.esta_revelada(*divmod(idx, self._mundo.tam_chunk))
+
+    def revelar_varias(self, celdas):
+        tam = self._mundo.tam_chunk
+        nuevas = []
+        for x, y in celdas:
+            chunk = self._mundo._chunk(x // tam, y // tam)
+            if chunk.niebla.revelar(x % tam, y % tam):
+                nuevas.append((x, y))
+        self.explorado += len(nuevas)
+        return nuevas
+
+    def porcentaje_explorado(self):
+        total = self._mundo.filas * self._mundo.columnas
+        return 100.0 * self.explorado / total if total else 0.0
+
+
+# ===================== Mundo =====================
+class MundoChunks(Mapa):
+    def __init__(self, nivel=1, seed=None, tam_chunk=None, capacidad=None, directorio=None,
+                 generador=None, modo_vision=None):
+        self.tam_chunk = tam_chunk or CHUNK_SIZE
+        self.filas = self.columnas = self.tam_chunk * CHUNK_WORLD_CHUNKS
+        self.nivel = nivel
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self.backend = TERRAIN_BACKEND
+        self.generador = generador or TERRAIN_GENERATOR
+        self.paralelo = False
+        # En un turno se tocan la zona activa, los chunks a los que puede
+        # cruzar un enemigo de ella y las ventanas de visión y del campo de
+        # distancias; con menos capacidad la LRU expulsaría chunks en uso.
+        alcance = max(2, -(-max(ENEMY_FLOW_RADIUS, VISIBLE_RADIUS) // self.tam_chunk))
+        self.capacidad = max((2 * alcance + 1) ** 2, capacidad or CHUNK_CACHE)
+        self.almacen = AlmacenChunks(directorio)
+        self._chunks = OrderedDict()   # (ci, cj) -> Chunk, del menos al más reciente
+
+        self.base_matriz = TerrenoChunks(self)
+        self.revelado = NieblaChunks(self)
+        self.modo_vision = modo_vision or FOV_MODE
+        self.campo_vision = CampoVision(self._es_opaca, self.filas, self.columnas)
+        self.campo_flujo = CampoFlujo(self._es_opaca, self.filas, self.columnas, ENEMY_FLOW_RADIUS)
+        self._tabla_enemigos = None
+        self.historial = None
+        self.respaldo = None
+        self._motor_bfs = None
+        self.estadisticas = {}
+
+        # Inicio en el chunk central y portal a CHUNK_PORTAL_DISTANCE chunks;
+        # ambos en el puerto norte de su chunk, que siempre está conectado.
+        rng = random.Random(f"{self.seed}:mundo")
+        centro = CHUNK_WORLD_CHUNKS // 2
+        self._inicio = (centro * self.tam_chunk, centro * self.tam_chunk + self.tam_chunk // 2)
+        pci = centro + rng.choice((-1, 1)) * CHUNK_PORTAL_DISTANCE
+        pcj = centro + rng.randint(-CHUNK_PORTAL_DISTANCE, CHUNK_PORTAL_DISTANCE)
+        self.portal = (pci * self.tam_chunk, pcj * self.tam_chunk + self.tam_chunk // 2)
+        self.jugador = None
+
+    # ===================== API de Mapa =====================
+    def generar_mapa(self):
+        """Coloca al jugador; los chunks se generan a medida que se visitan."""
+        x, y = self._inicio
+        self.jugador = Personaje(x, y)
+        self.terreno_modificado()
+        self.revelar_area(x, y, VISIBLE_RADIUS)
+
+    @property
+    def enemigos(self):
+        """Enemigos de la zona activa (3x3 chunks alrededor del jugador)."""
+        activos = []
+        for chunk in self._zona_activa():
+            activos.extend(chunk.enemigos)
+        return activos
+
+    @property
+    def cofres(self):
+        activos = []
+        for chunk in self._zona_activa():
+            activos.extend(chunk.cofres)
+        return activos
+
+    def eliminar_enemigo(self, enemigo):
+        # enemigo_movido mantiene a cada enemigo en la lista de su chunk
+        self._chunk(enemigo.x // self.tam_chunk, enemigo.y // self.tam_chunk).enemigos.remove(enemigo)
+
+    # --- Entidades por posición: los chunks son el índice ---
+    def indexar_entidades(self):
+        pass
+
+    def enemigo_movido(self, enemigo, x0, y0):
+        """Si cruzó a otro chunk, lo muda a la lista de ese chunk."""
+        tam = self.tam_chunk
+        origen = (x0 // tam, y0 // tam)
+        destino = (enemigo.x // tam, enemigo.y // tam)
+        if origen != destino:
+            self._chunk(*origen).enemigos.remove(enemigo)
+            self._chunk(*destino).enemigos.append(enemigo)
+
+    def abrir_cofre(self, cofre):
+        cofre.abierto = True
+
+    def enemigos_despiertos(self):
+        # Los chunks ya son la rejilla de activación: sólo existe la zona activa
+        return self.enemigos
+
+    def enemigos_en_turno(self, turno):
+        # La zona activa cambia al cruzar de chunk: se mira entera cada turno
+        return self.enemigos
+
+    def reprogramar_enemigos(self, enemigos, turno):
+        pass
+
+    def tabla_enemigos(self):
+        # La lista de enemigos cambia con la zona activa: se mueven uno a uno
+        return None
+
+    def enemigos_en(self, x, y):
+        chunk, _ = self._localizar(x, y)
+        return [e for e in chunk.enemigos if e.x == x and e.y == y]
+
+    def cofre_en(self, x, y):
+        chunk, _ = self._localizar(x, y)
+        for c in chunk.cofres:
+            if not c.abierto and c.x == x and c.y == y:
+                return c
+        return None
+
+    def enemigos_en_rectangulo(self, x0, y0, x1, y1):
+        return [e for e in self.enemigos if x0 <= e.x < x1 and y0 <= e.y < y1]
+
+    def cofres_en_rectangulo(self, x0, y0, x1, y1):
+        return [c for c in self.cofres if not c.abierto and x0 <= c.x < x1 and y0 <= c.y < y1]
+
+    def chunks_en_memoria(self):
+        return len(self._chunks)
+
+    def cerrar(self):
+        """Descarta los chunks y borra el almacén si es temporal."""
+        self._chunks.clear()
+        self.almacen.cerrar()
+
+    # ===================== Chunks =====================
+    def _zona_activa(self):
+        ci = self.jugador.x // self.tam_chunk
+        cj = self.jugador.y // self.tam_chunk
+        return [self._chunk(i, j)
+                for i in range(max(0, ci - 1), min(CHUNK_WORLD_CHUNKS, ci + 2))
+                for j in range(max(0, cj - 1), min(CHUNK_WORLD_CHUNKS, cj + 2))]
+
+    def _localizar(self, x, y):
+        """(chunk, índice local) de la celda (x, y)."""
+        tam = self.tam_chunk
+        return self._chunk(x // tam, y // tam), (x % tam) * tam + y % tam
+
+    def _chunk(self, ci, cj):
+        clave = (ci, cj)
+        chunk = self._chunks.get(clave)
+        if chunk is not None:
+            self._chunks.move_to_end(clave)
+            return chunk
+        chunk = self.almacen.cargar(ci, cj, self.tam_chunk)
+        if chunk is None:
+            chunk = self._generar_chunk(ci, cj)
+        self._chunks[clave] = chunk
+        while len(self._chunks) > self.capacidad:
+            _, frio = self._chunks.popitem(last=False)
+            self.almacen.guardar(frio)
+        return chunk
+
+    def _generar_chunk(self, ci, cj):
+        tam = self.tam_chunk
+        rng = random.Random(f"{self.seed}:{ci}:{cj}")
+        prob_suelo = max(0.50, 0.72 - 0.02 * (self.nivel - 1))
+
+        tesela = Tesela(crear_base_matriz(tam, tam, self.backend), tam, tam)
+        obtener_generador(self.generador)(tesela, prob_suelo, rng)
+        terreno = bytearray(SUELO if c in CELDAS_TRANSITABLES else MURO
+                            for fila in tesela.base_matriz for c in fila)
+
+        rect = (ci * tam, cj * tam, (ci + 1) * tam, (cj + 1) * tam)
+        puertos = puertos_tesela(rect, self.filas, self.columnas)
+        for idx in conectar_puertos(terreno, tam, tam, puertos):
+            terreno[idx] = SUELO
+
+        chunk = Chunk(ci, cj, terreno, Niebla(tam, tam))
+        reservadas = set()
+        for x, y in (self._inicio, self.portal):
+            if x // tam == ci and y // tam == cj:
+                reservadas.add((x % tam) * tam + y % tam)
+        if self.portal[0] // tam == ci and self.portal[1] // tam == cj:
+            terreno[(self.portal[0] % tam) * tam + self.portal[1] % tam] = PORTAL
+        self._poblar_chunk(chunk, puertos[0] if puertos else (tam // 2, tam // 2), reservadas, rng)
+        return chunk
+
+    def _poblar_chunk(self, chunk, puerto, reservadas, rng):
+        """Enemigos y cofres en la región conectada del chunk."""
+        tam = self.tam_chunk
+        motor = MotorBFS(tam, tam)
+        n = motor.explorar(chunk.terreno, (puerto[0] * tam + puerto[1],))
+        disponibles = [idx for idx in motor.orden[:n] if idx not in reservadas]
+        lejos_del_inicio = disponibles
+        if reservadas:
+            # Chunk de inicio: nada de enemigos pegados al jugador
+            ix, iy = self._inicio
+            ox, oy = chunk.ci * tam, chunk.cj * tam
+            lejos_del_inicio = [idx for idx in disponibles
+                                if abs(ox + idx // tam - ix) + abs(oy + idx % tam - iy) >= ENEMY_PLAYER_MIN_DIST]
+
+        area = tam * tam
+        num_enemigos = min(max(1, area // 200), len(lejos_del_inicio))
+        num_cofres = min(max(1, area // 250), len(disponibles) - num_enemigos)
+
+        rejilla = RejillaSeparacion(tam, tam, ENEMY_ENEMY_MIN_DIST)
+        elegidos = muestrear_separadas(lejos_del_inicio, num_enemigos, rejilla, tam, rng)
+        elegidos = completar(elegidos, lejos_del_inicio, num_enemigos, rng)
+        for idx in elegidos:
+            e = Enemigo(chunk.ci * tam + idx // tam, chunk.cj * tam + idx % tam)
+            e.vision = min(9, 5 + self.nivel // 3)
+            chunk.enemigos.append(e)
+
+        ocupadas = set(elegidos)
+        libres = [idx for idx in disponibles if idx not in ocupadas]
+        rejilla = RejillaSeparacion(tam, tam, CHEST_CHEST_MIN_DIST)
+        elegidos = muestrear_separadas(libres, max(0, num_cofres), rejilla, tam, rng)
+        for idx in completar(elegidos, libres, max(0, num_cofres), rng):
+            chunk.cofres.append(Cofre(chunk.ci * tam + idx // tam, chunk.cj * tam + idx % tam, rng))
@@ -0,0 +1,160 @@
+# Niebla de guerra empaquetada en bits.
+#
+# Sustituye a la lista de listas de bools de Mapa.revelado: un bit por celda
+# en un bytearray, con un contador de celdas exploradas que se mantiene al
+# revelar, de modo que el porcentaje explorado no requiere recorrer el mapa.
+# Admite el acceso clásico revelado[x][y] para lectura y escritura, con los
+# índices comprobados como en una lista (una columna fuera de rango no debe
+# caer en la fila siguiente). Los métodos por celda (esta_revelada, revelar...)
+# no comprueban nada: los usan los bucles internos con celdas ya validadas.
+
+import struct
+
+# Cabecera de serialización: filas, columnas, celdas exploradas
+_CABECERA = struct.Struct('<III')
+
+
+def _indice(i, limite):
+    """`i` como índice de una lista de `limite` elementos (admite negativos)."""
+    if i < 0:
+        i += limite
+    if not 0 <= i < limite:
+        raise IndexError("índice de niebla fuera de rango")
+    return i
+
+
+class _FilaNiebla:
+    """Vista de una fila de la niebla que permite revelado[x][y]."""
+    __slots__ = ('_niebla', '_x')
+
+    def __init__(self, niebla, x):
+        self._niebla = niebla
+        self._x = x
+
+    def __len__(self):
+        return self._niebla.columnas
+
+    def __getitem__(self, y):
+        return self._niebla.esta_revelada(self._x, _indice(y, self._niebla.columnas))
+
+    def __setitem__(self, y, valor):
+        y = _indice(y, self._niebla.columnas)
+        if valor:
+            self._niebla.revelar(self._x, y)
+        else:
+            self._niebla.ocultar(self._x, y)
+
+    def __iter__(self):
+        for y in range(self._niebla.columnas):
+            yield self._niebla.esta_revelada(self._x, y)
+
+
+class Niebla:
+    """Celdas exploradas del mapa, un bit por celda."""
+
+    def __init__(self, filas, columnas):
+        self.filas = filas
+        self.columnas = columnas
+        self.bits = bytearray((filas * columnas + 7) // 8)
+        self.explorado = 0  # celdas reveladas hasta ahora
+
+    # --- Acceso estilo lista de listas ---
+    def __len__(self):
+        return self.filas
+
+    def __getitem__(self, x):
+        return _FilaNiebla(self, _indice(x, self.filas))
+
+    def __iter__(self):
+        for x in range(self.filas):
+            yield _FilaNiebla(self, x)
+
+    # --- Consulta y modificación ---
+    def esta_revelada(self, x, y):
+        idx = x * self.columnas + y
+        return bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+
+    def revelar(self, x, y):
+        """Revela la celda; devuelve True si no estaba revelada."""
+        idx = x * self.columnas + y
+        mascara = 1 << (idx & 7)
+        byte = self.bits[idx >> 3]
+        if byte & mascara:
+            return False
+        self.bits[idx >> 3] = byte | mascara
+        self.explorado += 1
+        return True
+
+    def ocultar(self, x, y):
+        idx = x * self.columnas + y
+        mascara = 1 << (idx & 7)
+        byte = self.bits[idx >> 3]
+        if byte & mascara:
+            self.bits[idx >> 3] = byte & ~mascara
+            self.explorado -= 1
+
+    def revelar_varias(self, celdas):
+        """Revela en bloque un iterable de (x, y); devuelve las que eran nuevas."""
+        bits = self.bits
+        columnas = self.columnas
+        nuevas = []
+        for x, y in celdas:
+            idx = x * columnas + y
+            mascara = 1 << (idx & 7)
+            byte = bits[idx >> 3]
+            if not byte & mascara:
+                bits[idx >> 3] = byte | mascara
+                nuevas.append((x, y))
+        self.explorado += len(nuevas)
+        return nuevas
+
+    def reveladas(self, celdas):
+        """Lista de bools con el estado de cada (x, y) del iterable."""
+        bits = self.bits
+        columnas = self.columnas
+        resultado = []
+        for x, y in celdas:
+            idx = x * columnas + y
+            resultado.append(bool(bits[idx >> 3] & (1 << (idx & 7))))
+        return resultado
+
+    # --- Estadísticas ---
+    def porcentaje_explorado(self):
+        total = self.filas * self.columnas
+        return 100.0 * self.explorado / total if total else 0.0
+
+    # --- Serialización ---
+    def a_bytes(self):
+        """Serializa la niebla en formato compacto (cabecera + bits)."""
+        return _CABECERA.pack(self.filas, self.columnas, self.explorado) + bytes(self.bits)
+
+    @classmethod
+    def sobre_buffer(cls, filas, columnas, bits, explorado):
+        """Niebla que usa `bits` (p. ej. una vista de un mmap) sin copiarlo.
+
+        `bits` debe ser un buffer escribible de (filas * columnas + 7) // 8 bytes.
+        """
+        if len(bits) != (filas * columnas + 7) // 8:
+            raise ValueError(f"La niebla de {filas}x{columnas} ocupa {(filas * columnas + 7) // 8} bytes, "
+                             f"no {len(bits)}")
+        niebla = cls.__new__(cls)
+        niebla.filas = filas
+        niebla.columnas = columnas
+        niebla.bits = bits
+        niebla.explorado = explorado
+        return niebla
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        if len(datos) < _CABECERA.size:
+            raise ValueError("Niebla serializada incompleta")
+        filas, columnas, explorado = _CABECERA.unpack_from(datos)
+        niebla = cls(filas, columnas)
+        inicio = _CABECERA.size
+        # Con menos datos, la asignación por rebanada encogería el bytearray
+        if len(datos) < inicio + len(niebla.bits):
+            raise ValueError(f"La niebla de {filas}x{columnas} ocupa {len(niebla.bits)} bytes, "
+                             f"no {len(datos) - inicio}")
+        niebla.bits[:] = datos[inicio:inicio + len(niebla.bits)]
+        niebla.explorado = explorado
+        return niebla
@@ -0,0 +1,106 @@
+# Paquetes de niveles pregenerados.
+#
+# Un paquete es un fichero con N niveles ya generados, cada uno comprimido
+# por separado para poder leer cualquiera sin descomprimir los demás:
+#
+#   b'NIVP' | versión u16 | N u32 | N+1 offsets u64 | registros
+#
+# Cada registro (zlib) lleva una cabecera con tamaño, semilla, generador,
+# jugador y portal, seguida del terreno (un byte por celda) y de las
+# entidades (serializacion.py). La niebla no se guarda: un nivel recién
+# cargado sólo tiene revelada el área inicial.
+
+import struct
+import zlib
+
+from config import VISIBLE_RADIUS, TERRAIN_BACKEND
+from entidades import Personaje
+from mapa import Mapa
+from serializacion import (codigos_terreno, terreno_desde_codigos, empaquetar_enemigos,
+                           desempaquetar_enemigos, empaquetar_cofres, desempaquetar_cofres,
+                           SIN_SEMILLA, semilla_u64)
+
+MAGIA = b'NIVP'
+VERSION = 2
+_CABECERA_PAQUETE = struct.Struct('<4sHI')
+_OFFSET = struct.Struct('<Q')
+# filas, columnas, semilla, generador, jugador x/y, portal x/y, n_enemigos, n_cofres
+_CABECERA_NIVEL = struct.Struct('<IIQ16siiiiII')
+
+
+def nivel_a_bytes(mapa):
+    """Registro comprimido de un mapa ya generado."""
+    semilla = SIN_SEMILLA if mapa.seed is None else semilla_u64(mapa.seed)
+    cabecera = _CABECERA_NIVEL.pack(mapa.filas, mapa.columnas, semilla, mapa.generador.encode(),
+                                    mapa.jugador.x, mapa.jugador.y, mapa.portal[0], mapa.portal[1],
+                                    len(mapa.enemigos), len(mapa.cofres))
+    return zlib.compress(b''.join((cabecera, codigos_terreno(mapa.base_matriz),
+                                   empaquetar_enemigos(mapa.enemigos), empaquetar_cofres(mapa.cofres))))
+
+
+def nivel_desde_bytes(datos, backend=None):
+    """Mapa listo para jugar a partir de un registro de nivel_a_bytes."""
+    datos = zlib.decompress(datos)
+    (filas, columnas, semilla, generador, jx, jy, px, py,
+     n_enemigos, n_cofres) = _CABECERA_NIVEL.unpack_from(datos)
+    pos = _CABECERA_NIVEL.size
+    backend = backend or TERRAIN_BACKEND
+    base_matriz = terreno_desde_codigos(datos[pos:pos + filas * columnas], filas, columnas, backend)
+    pos += filas * columnas
+    # La semilla va al constructor para que mapa.rng salga de ella y no del azar
+    mapa = Mapa(filas, columnas, seed=None if semilla == SIN_SEMILLA else semilla, backend=backend,
+                generador=generador.rstrip(b'\0').decode(), base_matriz=base_matriz)
+    mapa.enemigos, pos = desempaquetar_enemigos(datos, pos, n_enemigos)
+    mapa.cofres, pos = desempaquetar_cofres(datos, pos, n_cofres)
+    mapa.jugador = Personaje(jx, jy)
+    mapa.portal = (px, py)
+    mapa.indexar_entidades()
+    mapa.terreno_modificado()
+    mapa.revelar_area(jx, jy, VISIBLE_RADIUS)
+    return mapa
+
+
+def escribir_paquete(ruta, registros, cantidad):
+    """Escribe `cantidad` registros (iterable de bytes) en un paquete.
+
+    Los registros se vuelcan a medida que llegan; la tabla de offsets se
+    completa al final.
+    """
+    tabla = _CABECERA_PAQUETE.size
+    with open(ruta, 'wb') as f:
+        f.write(_CABECERA_PAQUETE.pack(MAGIA, VERSION, cantidad))
+        f.write(bytes(_OFFSET.size * (cantidad + 1)))
+        offsets = [f.tell()]
+        for registro in registros:
+            f.write(registro)
+            offsets.append(f.tell())
+        if len(offsets) != cantidad + 1:
+            raise ValueError(f"Se esperaban {cantidad} niveles y llegaron {len(offsets) - 1}")
+        f.seek(tabla)
+        f.write(b''.join(_OFFSET.pack(o) for o in offsets))
+
+
+class PaqueteNiveles:
+    """Lector de un paquete con acceso directo a cada nivel."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            magia, version, cantidad = _CABECERA_PAQUETE.unpack(f.read(_CABECERA_PAQUETE.size))
+            if magia != MAGIA:
+                raise ValueError(f"{ruta} no es un paquete de niveles")
+            if version != VERSION:
+                raise ValueError(f"Versión de paquete no soportada: {version}")
+            tabla = f.read(_OFFSET.size * (cantidad + 1))
+        self.offsets = [o for (o,) in _OFFSET.iter_unpack(tabla)]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def registro(self, i):
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.offsets[i])
+            return f.read(self.offsets[i + 1] - self.offsets[i])
+
+    def nivel(self, i, backend=None):
+        return nivel_desde_bytes(self.registro(i), backend)
@@ -0,0 +1,152 @@
+# Partidas guardadas en formato binario versionado.
+#
+# Una partida guarda el nivel del juego, el mapa (terreno, niebla, portal,
+# enemigos y cofres) y el jugador con su inventario y corazones:
+#
+#   cabecera | jugador | entidades | terreno (alineado) | niebla (alineada)
+#
+# El terreno (un byte de código por celda, terreno.py) y la niebla (los bits
+# de niebla.py) se escriben tal cual están en memoria, alineados a 64 bytes.
+# Al cargar se hace mmap del fichero en modo copia privada y, con el backend
+# 'numpy', la grilla y la niebla son vistas sobre ese mmap: no se decodifica
+# ninguna celda ni se copia el fichero, las páginas se leen bajo demanda y
+# sólo las que se modifican jugando ocupan memoria propia. Con el backend
+# 'lista' el terreno hay que convertirlo a caracteres igualmente.
+
+import mmap
+import os
+import struct
+
+from entidades import Personaje, CONTENIDOS
+from mapa import Mapa
+from mundo import MundoChunks
+from niebla import Niebla
+from serializacion import (codigos_terreno, terreno_desde_codigos, empaquetar_enemigos,
+                           desempaquetar_enemigos, empaquetar_cofres, desempaquetar_cofres,
+                           comprobar_codigos, ENEMIGO, COFRE, SIN_SEMILLA, semilla_u64)
+from terreno import GrillaTerreno, np
+
+MAGIA = b'PART'
+VERSION = 2
+ALINEACION = 64
+# magia, versión, nivel, filas, columnas, semilla, generador, backend, modo de
+# visión, portal x/y, celdas exploradas, n_enemigos, n_cofres, offsets de
+# terreno y niebla
+_CABECERA = struct.Struct('<4sHIIIQ16s8s16siiQIIQQ')
+# x, y, movimientos, corazones totales/llenos, armaduras, espadas, puntuación
+_JUGADOR = struct.Struct('<iiiiiiiq')
+
+
+def _alinear(pos):
+    return -(-pos // ALINEACION) * ALINEACION
+
+
+def guardar_partida(ruta, mapa, nivel):
+    """Guarda la partida (mapa actual y nivel del juego) en `ruta`."""
+    if isinstance(mapa, MundoChunks):
+        raise ValueError("Los mundos por chunks no se pueden guardar como partida")
+    j = mapa.jugador
+    jugador = _JUGADOR.pack(j.x, j.y, j.movimientos, j.corazones_totales, j.corazones_llenos,
+                            j.armaduras, j.espadas, j.puntuacion)
+    entidades = empaquetar_enemigos(mapa.enemigos) + empaquetar_cofres(mapa.cofres)
+
+    if isinstance(mapa.base_matriz, GrillaTerreno):
+        # Vista de la matriz: se escribe sin pasar por bytes intermedios
+        terreno = memoryview(np.ascontiguousarray(mapa.base_matriz.codigos)).cast('B')
+    else:
+        terreno = codigos_terreno(mapa.base_matriz)
+    niebla = mapa.revelado
+
+    off_terreno = _alinear(_CABECERA.size + len(jugador) + len(entidades))
+    off_niebla = _alinear(off_terreno + len(terreno))
+    semilla = SIN_SEMILLA if mapa.seed is None else semilla_u64(mapa.seed)
+    cabecera = _CABECERA.pack(MAGIA, VERSION, nivel, mapa.filas, mapa.columnas, semilla,
+                              mapa.generador.encode(), mapa.backend.encode(), mapa.modo_vision.encode(),
+                              mapa.portal[0], mapa.portal[1], niebla.explorado,
+                              len(mapa.enemigos), len(mapa.cofres), off_terreno, off_niebla)
+
+    # Escribir aparte y renombrar: nunca queda una partida a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(cabecera)
+        f.write(jugador)
+        f.write(entidades)
+        f.write(bytes(off_terreno - f.tell()))
+        f.write(terreno)
+        f.write(bytes(off_niebla - f.tell()))
+        f.write(niebla.bits)
+    # Un fichero con un mmap abierto no se puede sustituir (en Windows): si el
+    # mapa viene de una partida cargada, pasa antes a memoria propia
+    del terreno, niebla
+    mapa.soltar_respaldo()
+    os.replace(temporal, ruta)
+
+
+def cargar_partida(ruta, backend=None):
+    """Carga una partida de guardar_partida; devuelve (nivel, mapa).
+
+    `backend` fuerza el backend de terreno; por defecto, el de la partida.
+    """
+    with open(ruta, 'rb') as f:
+        datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(datos) < _CABECERA.size:
+        raise ValueError(f"{ruta} no es una partida guardada")
+    (magia, version, nivel, filas, columnas, semilla, generador, backend_guardado, modo_vision,
+     px, py, explorado, n_enemigos, n_cofres, off_terreno, off_niebla) = _CABECERA.unpack_from(datos)
+    if magia != MAGIA:
+        raise ValueError(f"{ruta} no es una partida guardada")
+    if version != VERSION:
+        raise ValueError(f"Versión de partida no soportada: {version} (se esperaba {VERSION})")
+    # Un fichero truncado o corrupto se rechaza aquí en vez de cargarse a medias
+    celdas = filas * columnas
+    fin_entidades = _CABECERA.size + _JUGADOR.size + n_enemigos * ENEMIGO.size + n_cofres * COFRE.size
+    if not (fin_entidades <= off_terreno and off_terreno + celdas <= off_niebla
+            and off_niebla + (celdas + 7) // 8 <= len(datos)):
+        raise ValueError(f"{ruta} está truncada o corrupta")
+
+    backend = backend or backend_guardado.rstrip(b'\0').decode()
+    if backend == 'numpy' and np is None:
+        backend = 'lista'
+
+    pos = _CABECERA.size
+    try:
+        (jx, jy, movimientos, totales, llenos, armaduras, espadas,
+         puntuacion) = _JUGADOR.unpack_from(datos, pos)
+        pos += _JUGADOR.size
+        enemigos, pos = desempaquetar_enemigos(datos, pos, n_enemigos)
+        cofres, pos = desempaquetar_cofres(datos, pos, n_cofres)
+    except struct.error as e:
+        raise ValueError(f"{ruta} está truncada o corrupta: {e}") from e
+
+    def fuera(x, y):
+        return not (0 <= x < filas and 0 <= y < columnas)
+
+    # Una visión desmesurada haría recorrer el índice espacial entero cada turno
+    if (explorado > celdas or fuera(jx, jy) or fuera(px, py)
+            or any(fuera(e.x, e.y) or not 0 <= e.vision <= filas + columnas for e in enemigos)
+            or any(fuera(c.x, c.y) or c.codigo >= len(CONTENIDOS) for c in cofres)):
+        raise ValueError(f"{ruta} está corrupta: hay datos fuera del mapa")
+
+    # Terreno y niebla: vistas sobre el mmap (copia privada, escribible); el
+    # Mapa se crea ya con ellas para no reservar una grilla y una niebla vacías
+    vista = memoryview(datos)
+    if backend == 'numpy':
+        codigos = np.frombuffer(datos, dtype=np.uint8, count=celdas, offset=off_terreno)
+        comprobar_codigos(codigos)
+        base_matriz = GrillaTerreno.desde_codigos(codigos.reshape(filas, columnas))
+    else:
+        base_matriz = terreno_desde_codigos(vista[off_terreno:off_terreno + celdas], filas, columnas, backend)
+    revelado = Niebla.sobre_buffer(filas, columnas, vista[off_niebla:off_niebla + (celdas + 7) // 8], explorado)
+    mapa = Mapa(filas, columnas, seed=None if semilla == SIN_SEMILLA else semilla, backend=backend,
+                generador=generador.rstrip(b'\0').decode(), modo_vision=modo_vision.rstrip(b'\0').decode(),
+                base_matriz=base_matriz, revelado=revelado)
+    mapa.respaldo = datos
+
+    j = mapa.jugador = Personaje(jx, jy)
+    j.movimientos = movimientos
+    j.corazones_totales, j.corazones_llenos = totales, llenos
+    j.armaduras, j.espadas, j.puntuacion = armaduras, espadas, puntuacion
+    mapa.enemigos, mapa.cofres = enemigos, cofres
+    mapa.portal = (px, py)
+    mapa.indexar_entidades()
+    return nivel, mapa
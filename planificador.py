@@ -0,0 +1,44 @@
+# Rueda de tiempos para programar acciones por turno.
+#
+# Cada entidad se apunta en la ranura del turno en que le toca actuar
+# (turno % ranuras) y avanzar(turno) saca sólo las de ese turno, así que el
+# coste de un turno es el de las entidades que actúan en él y no el de todas
+# las programadas. Los turnos más lejanos que una vuelta de la rueda se
+# quedan en su ranura hasta que llega su vuelta.
+#
+# Los turnos deben avanzar de uno en uno; si no (deshacer, cargar), quien
+# usa la rueda la vacía y vuelve a programar.
+
+
+class RuedaTurnos:
+    def __init__(self, ranuras=64):
+        self._ranuras = [[] for _ in range(ranuras)]
+        self.turno = None   # último turno atendido (None: rueda sin empezar)
+
+    def __len__(self):
+        return sum(len(ranura) for ranura in self._ranuras)
+
+    def vaciar(self, turno=None):
+        """Olvida todo lo programado; el próximo turno a atender es turno + 1."""
+        for ranura in self._ranuras:
+            ranura.clear()
+        self.turno = turno
+
+    def programar(self, entidad, turno):
+        """Apunta a `entidad` para `turno` (posterior al último atendido)."""
+        if self.turno is not None and turno <= self.turno:
+            raise ValueError(f"Turno {turno} ya atendido (último: {self.turno})")
+        self._ranuras[turno % len(self._ranuras)].append((turno, entidad))
+
+    def avanzar(self, turno):
+        """Saca y devuelve las entidades programadas para `turno`."""
+        ranura = self._ranuras[turno % len(self._ranuras)]
+        self.turno = turno
+        if not ranura:
+            return []
+        vencen = [entidad for t, entidad in ranura if t == turno]
+        if len(vencen) == len(ranura):
+            ranura.clear()
+        else:
+            ranura[:] = [(t, entidad) for t, entidad in ranura if t != turno]
+        return vencen
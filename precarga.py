@@ -0,0 +1,76 @@
+# Precarga del siguiente nivel en segundo plano.
+#
+# Mientras se juega un nivel, el mapa del siguiente se genera en un hilo
+# (o en un proceso) aparte. Al cruzar el portal, Juego.cambiar_mapa lo
+# recoge ya listo; si todavía no terminó, espera a que acabe el trabajo en
+# curso, y si no hay precarga que sirva genera el mapa en el momento.
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from cache_mapas import cache_por_defecto
+
+MODOS = ('hilo', 'proceso')
+
+
+def construir_nivel(filas, columnas, generador, semilla=None):
+    """Crea y genera el mapa de un nivel (también sirve en otro proceso).
+
+    Con semilla, el mapa sale de la caché de mapas si ya se había generado.
+    """
+    return cache_por_defecto().obtener(filas, columnas, semilla, generador)
+
+
+class PrecargaNiveles:
+    def __init__(self, modo='hilo'):
+        """modo: 'hilo', 'proceso' o None para desactivar la precarga."""
+        if modo is not None and modo not in MODOS:
+            raise ValueError(f"Modo de precarga desconocido: {modo!r} (opciones: {', '.join(MODOS)})")
+        self.modo = modo
+        self._pool = None
+        self._clave = None
+        self._futuro = None
+
+    def solicitar(self, filas, columnas, generador, semilla=None):
+        """Empieza a generar en segundo plano el mapa con estos parámetros."""
+        if self.modo is None:
+            return
+        self.descartar()
+        if self._pool is None:
+            pool = ThreadPoolExecutor if self.modo == 'hilo' else ProcessPoolExecutor
+            self._pool = pool(max_workers=1)
+        self._clave = (filas, columnas, generador, semilla)
+        self._futuro = self._pool.submit(construir_nivel, filas, columnas, generador, semilla)
+
+    def lista(self):
+        return self._futuro is not None and self._futuro.done()
+
+    def obtener(self, filas, columnas, generador, semilla=None):
+        """Mapa precargado con estos parámetros, o None si no hay ninguno.
+
+        Si el trabajo ya está en marcha se espera a que termine (siempre es
+        antes que empezar de cero); si ni siquiera empezó, se cancela.
+        """
+        futuro, clave = self._futuro, self._clave
+        self._futuro = self._clave = None
+        if futuro is None or clave != (filas, columnas, generador, semilla):
+            if futuro is not None:
+                futuro.cancel()
+            return None
+        if not futuro.done() and futuro.cancel():
+            return None
+        try:
+            return futuro.result()
+        except Exception:
+            # Si la precarga falló, el llamador genera el mapa en el momento
+            return None
+
+    def descartar(self):
+        if self._futuro is not None:
+            self._futuro.cancel()
+        self._futuro = self._clave = None
+
+    def cerrar(self):
+        self.descartar()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,102 @@
+# Grabación y reproducción de partidas.
+#
+# Una repetición es la semilla de la partida seguida de las acciones del
+# jugador, cada una con el nivel en que se hizo. Con la semilla los mapas
+# salen idénticos (cada Mapa tiene su propio RNG), así que repetir las
+# acciones reproduce la partida exacta. Cada `cada` acciones se añade una
+# suma de comprobación del estado para detectar en qué punto diverge.
+#
+#   b'REPL' | versión u16 | semilla u64 | cada u32 | eventos
+#
+# Cada evento es (nivel u16, acción u8); tras la acción SUMA va una crc32.
+
+import struct
+import zlib
+
+from serializacion import empaquetar_enemigos, semilla_u64
+
+MAGIA = b'REPL'
+VERSION = 2
+_CABECERA = struct.Struct('<4sHQI')
+_EVENTO = struct.Struct('<HB')
+_SUMA = struct.Struct('<I')
+_JUGADOR = struct.Struct('<iiiiiiiqii')
+
+# Acciones
+ARRIBA, ABAJO, IZQUIERDA, DERECHA, DESHACER = range(5)
+SUMA = 0xFF
+MOVIMIENTOS = {ARRIBA: (-1, 0), ABAJO: (1, 0), IZQUIERDA: (0, -1), DERECHA: (0, 1)}
+
+
+class Divergencia(ValueError):
+    """La reproducción no llegó al mismo estado que la partida grabada."""
+
+
+def suma_estado(nivel, mapa):
+    """crc32 del estado jugable: jugador, portal, enemigos, cofres y niebla."""
+    j = mapa.jugador
+    suma = zlib.crc32(_JUGADOR.pack(j.x, j.y, j.movimientos, j.corazones_totales, j.corazones_llenos,
+                                    j.armaduras, j.espadas, j.puntuacion, nivel, mapa.revelado.explorado))
+    suma = zlib.crc32(struct.pack('<ii', *mapa.portal), suma)
+    suma = zlib.crc32(empaquetar_enemigos(mapa.enemigos), suma)
+    suma = zlib.crc32(bytes(c.abierto for c in mapa.cofres), suma)
+    bits = getattr(mapa.revelado, 'bits', None)
+    if bits is not None:
+        suma = zlib.crc32(bits, suma)
+    return suma
+
+
+class Grabacion:
+    """Escribe una repetición a medida que se juega."""
+
+    def __init__(self, ruta, semilla, cada):
+        self.ruta = ruta
+        self.semilla = semilla_u64(semilla)
+        self.cada = cada
+        self.acciones = 0
+        self._f = open(ruta, 'wb')
+        self._f.write(_CABECERA.pack(MAGIA, VERSION, self.semilla, cada))
+
+    def registrar(self, nivel, accion):
+        self._f.write(_EVENTO.pack(nivel, accion))
+        self.acciones += 1
+
+    def toca_suma(self):
+        return self.cada > 0 and self.acciones % self.cada == 0
+
+    def sumar(self, nivel, suma):
+        self._f.write(_EVENTO.pack(nivel, SUMA))
+        self._f.write(_SUMA.pack(suma))
+
+    def cerrar(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class Repeticion:
+    """Repetición cargada de disco."""
+
+    def __init__(self, ruta):
+        with open(ruta, 'rb') as f:
+            self.datos = f.read()
+        if len(self.datos) < _CABECERA.size:
+            raise ValueError(f"{ruta} no es una repetición")
+        magia, version, self.semilla, self.cada = _CABECERA.unpack_from(self.datos)
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es una repetición")
+        if version != VERSION:
+            raise ValueError(f"Versión de repetición no soportada: {version} (se esperaba {VERSION})")
+
+    def eventos(self):
+        """Genera (nivel, acción, suma); la suma sólo vale algo si acción es SUMA."""
+        datos = self.datos
+        pos = _CABECERA.size
+        while pos + _EVENTO.size <= len(datos):
+            nivel, accion = _EVENTO.unpack_from(datos, pos)
+            pos += _EVENTO.size
+            suma = None
+            if accion == SUMA:
+                (suma,) = _SUMA.unpack_from(datos, pos)
+                pos += _SUMA.size
+            yield nivel, accion, suma
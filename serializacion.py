@@ -0,0 +1,152 @@
+# Empaquetado binario de terreno y entidades.
+#
+# Formatos compartidos por el almacén de chunks (mundo.py), los paquetes de
+# niveles (paquete_niveles.py) y cualquier otro volcado binario: el terreno
+# va como un byte de código por celda (terreno.py) y cada entidad como un
+# registro struct de tamaño fijo. EnemigosEmpaquetados y CofresEmpaquetados
+# usan esos mismos registros como forma compacta para guardar muchas
+# entidades en memoria.
+
+import struct
+
+from entidades import Enemigo, Cofre
+from terreno import CARACTERES, CODIGOS, GrillaTerreno, crear_base_matriz, np
+
+# x, y, vida, vision, ultimo_movimiento, ultimo_dx, ultimo_dy, cadencia
+ENEMIGO = struct.Struct('<iiiiibbB')
+COFRE = struct.Struct('<iiBiB')         # x, y, código de contenido, valor, abierto
+# Las semillas se guardan como u64; el valor más alto marca "sin semilla"
+SIN_SEMILLA = 2 ** 64 - 1
+
+
+def semilla_u64(semilla):
+    """`semilla` reducida al rango de un u64 sin chocar con SIN_SEMILLA (None sigue siendo None)."""
+    return None if semilla is None else semilla % SIN_SEMILLA
+
+
+def _campos_enemigo(e):
+    return e.x, e.y, e.vida, e.vision, e.ultimo_movimiento, e.ultimo_dx, e.ultimo_dy, e.cadencia
+
+
+def _enemigo(x, y, vida, vision, ultimo, udx, udy, cadencia):
+    e = Enemigo(x, y)
+    e.vida, e.vision, e.ultimo_movimiento, e.ultimo_dx, e.ultimo_dy = vida, vision, ultimo, udx, udy
+    e.cadencia = cadencia
+    return e
+
+
+def _campos_cofre(c):
+    return c.x, c.y, c.codigo, c.valor, c.abierto
+
+
+def _cofre(x, y, codigo, valor, abierto):
+    c = Cofre(x, y, codigo=codigo, valor=valor)
+    c.abierto = bool(abierto)
+    return c
+
+
+def empaquetar_enemigos(enemigos):
+    return b''.join(ENEMIGO.pack(*_campos_enemigo(e)) for e in enemigos)
+
+
+def desempaquetar_enemigos(datos, pos, cantidad):
+    """Lee `cantidad` enemigos desde `pos`; devuelve (lista, nueva posición)."""
+    fin = pos + cantidad * ENEMIGO.size
+    return [_enemigo(*campos) for campos in ENEMIGO.iter_unpack(datos[pos:fin])], fin
+
+
+def empaquetar_cofres(cofres):
+    return b''.join(COFRE.pack(*_campos_cofre(c)) for c in cofres)
+
+
+def desempaquetar_cofres(datos, pos, cantidad):
+    """Lee `cantidad` cofres desde `pos`; devuelve (lista, nueva posición)."""
+    fin = pos + cantidad * COFRE.size
+    return [_cofre(*campos) for campos in COFRE.iter_unpack(datos[pos:fin])], fin
+
+
+class _Empaquetados:
+    """Secuencia de entidades guardadas como registros struct en un bytearray.
+
+    Ocupa el tamaño del registro por entidad, sin objetos de Python: cada
+    acceso crea un objeto nuevo, así que modificarlo no cambia el
+    contenedor (hay que volver a asignarlo con c[i] = entidad).
+    """
+    _registro = None
+
+    def __init__(self, entidades=()):
+        self.datos = bytearray()
+        self.extend(entidades)
+
+    def __len__(self):
+        return len(self.datos) // self._registro.size
+
+    def _posicion(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"Índice fuera de rango: {i}")
+        return i * self._registro.size
+
+    def __getitem__(self, i):
+        return self._crear(*self._registro.unpack_from(self.datos, self._posicion(i)))
+
+    def __setitem__(self, i, entidad):
+        self._registro.pack_into(self.datos, self._posicion(i), *self._campos(entidad))
+
+    def __iter__(self):
+        for campos in self._registro.iter_unpack(self.datos):
+            yield self._crear(*campos)
+
+    def append(self, entidad):
+        self.datos += self._registro.pack(*self._campos(entidad))
+
+    def extend(self, entidades):
+        self.datos += b''.join(self._registro.pack(*self._campos(e)) for e in entidades)
+
+
+class EnemigosEmpaquetados(_Empaquetados):
+    """Enemigos en registros ENEMIGO (ver _Empaquetados)."""
+    _registro = ENEMIGO
+    _campos = staticmethod(_campos_enemigo)
+    _crear = staticmethod(_enemigo)
+
+
+class CofresEmpaquetados(_Empaquetados):
+    """Cofres en registros COFRE (ver _Empaquetados)."""
+    _registro = COFRE
+    _campos = staticmethod(_campos_cofre)
+    _crear = staticmethod(_cofre)
+
+
+def codigos_terreno(base_matriz):
+    """Terreno como bytes: un código por celda, fila a fila."""
+    if isinstance(base_matriz, GrillaTerreno):
+        return base_matriz.codigos.tobytes()
+    return bytes(CODIGOS[c] for fila in base_matriz for c in fila)
+
+
+def comprobar_codigos(datos):
+    """Lanza ValueError si `datos` (bytes o array uint8) trae códigos de terreno que no existen."""
+    if np is not None:
+        codigos = datos if isinstance(datos, np.ndarray) else np.frombuffer(datos, dtype=np.uint8)
+        maximo = int(codigos.max(initial=0))
+    else:
+        maximo = max(datos, default=0)
+    if maximo >= len(CARACTERES):
+        raise ValueError(f"Código de terreno desconocido: {maximo}")
+
+
+def terreno_desde_codigos(datos, filas, columnas, backend='lista'):
+    """Reconstruye base_matriz (del backend pedido) a partir de codigos_terreno."""
+    comprobar_codigos(datos)
+    if backend == 'numpy':
+        grilla = GrillaTerreno(filas, columnas)
+        grilla.codigos[:] = np.frombuffer(datos, dtype=np.uint8, count=filas * columnas).reshape(filas, columnas)
+        return grilla
+    base_matriz = crear_base_matriz(filas, columnas, backend)
+    for x in range(filas):
+        inicio = x * columnas
+        base_matriz[x][:] = [CARACTERES[c] for c in datos[inicio:inicio + columnas]]
+    return base_matriz
@@ -0,0 +1,348 @@
+# Núcleo de la simulación del juego, sin pygame.
+#
+# Simulacion guarda el estado de la partida (nivel y mapa actual) y aplica
+# las reglas: mover al jugador, perseguir con los enemigos, abrir cofres,
+# resolver choques con espada/armadura/corazones y pasar de nivel por el
+# portal. Se maneja con step(accion), que devuelve la lista de eventos del
+# turno; Juego (juego.py) es sólo la ventana que traduce teclas en acciones
+# y eventos en mensajes, y cualquier otro cliente (IA, pruebas de carga,
+# servidor) puede usar el núcleo directamente.
+#
+# Cada evento es una tupla cuyo primer elemento es el tipo:
+#
+#   (NIVEL, nivel)                       empieza un nivel
+#   (PORTAL, nivel)                      se encontró el portal del nivel
+#   (COFRE, contenido, valor, puntos)    se abrió un cofre
+#   (ESPADA,)                            una espada eliminó a un enemigo
+#   (EMPUJON,)                           una armadura empujó a un enemigo
+#   (CORAZON, llenos, totales, empujon)  se perdió un corazón (empujon: falló el empujón)
+#   (DERROTA,)                           el jugador no tiene corazones
+#   (DESHACER, disponibles)              se deshizo un turno (disponibles < 0: no había)
+#   (CARGADA, nivel)                     se cargó una partida guardada
+
+import random
+
+from config import VISIBLE_RADIUS, CHUNKED_WORLD, LEVEL_PREFETCH, LEVEL_SEED
+from config import HISTORY_TURNS, REPLAY_CHECKSUM_EVERY, ENEMY_PATHFINDING
+from mundo import MundoChunks
+from precarga import PrecargaNiveles, construir_nivel
+from partida import guardar_partida, cargar_partida
+from historial import Historial
+from repeticion import Grabacion, Repeticion, Divergencia, suma_estado, MOVIMIENTOS, DESHACER, SUMA
+from entidades import OBJETO_ARMADURA, OBJETO_ESPADA, OBJETO_DINERO
+from generadores import generador_para_nivel
+from serializacion import semilla_u64
+from terreno import celda_transitable
+
+# Tipos de evento
+NIVEL = 'nivel'
+PORTAL = 'portal'
+COFRE = 'cofre'
+ESPADA = 'espada'
+EMPUJON = 'empujon'
+CORAZON = 'corazon'
+DERROTA = 'derrota'
+DESHACER_TURNO = 'deshacer'
+CARGADA = 'cargada'
+
+
+def tamano_nivel(nivel):
+    """Filas y columnas del mapa de un nivel (crece uno por nivel)."""
+    return 15 + nivel, 15 + nivel
+
+
+class Simulacion:
+    def __init__(self, semilla=None, precarga=LEVEL_PREFETCH, historial=HISTORY_TURNS):
+        """`semilla` fija los mapas de toda la partida (por defecto, LEVEL_SEED).
+
+        `precarga` es el modo de PrecargaNiveles (None para no precargar) y
+        `historial` los turnos que se pueden deshacer (0 para ninguno).
+        """
+        self.mapa = None
+        self.nivel = 1
+        self.terminada = False
+        # Semillas en el rango u64 de partidas, paquetes de niveles y repeticiones
+        self.semilla = semilla_u64(LEVEL_SEED if semilla is None else semilla)
+        self.precarga = PrecargaNiveles(precarga)
+        self.grabacion = None
+        # Los mundos por chunks no tienen una niebla plana que rebobinar
+        self.historial = Historial(historial) if historial and not CHUNKED_WORLD else None
+
+    # ===================== Partida =====================
+    def reiniciar(self):
+        """Empieza la partida en el nivel 1; devuelve los eventos."""
+        if self.mapa is not None:
+            self.mapa.cerrar()
+            self.mapa = None
+        self.nivel = 1
+        self.terminada = False
+        return self.cambiar_mapa()
+
+    def cambiar_mapa(self):
+        """Pasa al mapa del nivel actual conservando al jugador; devuelve los eventos."""
+        filas, columnas = tamano_nivel(self.nivel)
+        # Si es el primer mapa, crear jugador normal
+        if self.mapa is None:
+            self.mapa = self.crear_mapa(filas, columnas)
+        else:
+            # Guardar estado del jugador
+            j_prev = self.mapa.jugador
+            self.mapa.cerrar()
+            self.mapa = self.crear_mapa(filas, columnas)
+            # Transferir stats
+            j = self.mapa.jugador
+            j.corazones_totales = j_prev.corazones_totales
+            j.corazones_llenos = j_prev.corazones_llenos
+            j.armaduras = j_prev.armaduras
+            j.espadas = j_prev.espadas
+            j.puntuacion = j_prev.puntuacion
+
+        if self.historial is not None:
+            self.historial.reiniciar(self.mapa)
+        self._precargar_siguiente()
+        return [(NIVEL, self.nivel)]
+
+    def crear_mapa(self, filas, columnas):
+        """Mapa ya generado del nivel actual (o un mundo por chunks si CHUNKED_WORLD).
+
+        Usa el mapa precargado en segundo plano si lo hay; si no, lo genera ahora.
+        """
+        generador = generador_para_nivel(self.nivel)
+        semilla = self.semilla_nivel(self.nivel)
+        if CHUNKED_WORLD:
+            mapa = MundoChunks(nivel=self.nivel, seed=semilla, generador=generador)
+            mapa.generar_mapa()
+            return mapa
+        mapa = self.precarga.obtener(filas, columnas, generador, semilla)
+        if mapa is None:
+            mapa = construir_nivel(filas, columnas, generador, semilla)
+        return mapa
+
+    def semilla_nivel(self, nivel):
+        """Semilla del mapa de un nivel: fija si la partida tiene semilla, si no None."""
+        if self.semilla is None:
+            return None
+        return semilla_u64(self.semilla * 100003 + nivel)
+
+    def _precargar_siguiente(self):
+        # Ir generando el siguiente nivel mientras se juega este
+        if not CHUNKED_WORLD:
+            siguiente = self.nivel + 1
+            filas, columnas = tamano_nivel(siguiente)
+            self.precarga.solicitar(filas, columnas, generador_para_nivel(siguiente),
+                                    self.semilla_nivel(siguiente))
+
+    def cerrar(self):
+        self.terminar_grabacion()
+        if self.mapa is not None:
+            self.mapa.cerrar()
+        self.precarga.cerrar()
+
+    # ===================== Turnos =====================
+    def step(self, accion):
+        """Aplica una acción del jugador (repeticion.py) y devuelve los eventos del turno."""
+        if self.grabacion is not None:
+            self.grabacion.registrar(self.nivel, accion)
+        if accion == DESHACER:
+            eventos = self.deshacer()
+        else:
+            eventos = self.jugar_turno(*MOVIMIENTOS[accion])
+        if self.grabacion is not None and self.grabacion.toca_suma():
+            self.grabacion.sumar(self.nivel, suma_estado(self.nivel, self.mapa))
+        return eventos
+
+    def jugar_turno(self, dx, dy):
+        """Mueve al jugador y resuelve el turno; devuelve los eventos."""
+        eventos = []
+        mapa = self.mapa
+        j = mapa.jugador
+        if not j.mover(dx, dy, mapa.base_matriz):
+            return eventos
+        nuevas = mapa.revelar_area(j.x, j.y, VISIBLE_RADIUS, dx, dy)
+        if self.historial is not None:
+            self.historial.marcar_niebla(nuevas)
+        linea_de_vision = None
+        if mapa.modo_vision == 'sombras':
+            linea_de_vision = mapa.linea_de_vision
+        campo_flujo = None
+        if ENEMY_PATHFINDING == 'flujo':
+            # Un único campo de distancias para todos (se calcula si alguien persigue)
+            campo_flujo = mapa.campo_flujo
+            campo_flujo.fijar_origen(j.x, j.y)
+        tabla = mapa.tabla_enemigos()
+        if tabla is not None:
+            # Hordas: los despiertos en una pasada vectorizada
+            for enemigo, x0, y0 in tabla.perseguir(j, j.movimientos, linea_de_vision, campo_flujo):
+                mapa.enemigo_movido(enemigo, x0, y0)
+        else:
+            # Sólo los cercanos a los que les toca (Mapa.enemigos_en_turno)
+            actuan = mapa.enemigos_en_turno(j.movimientos)
+            for enemigo in actuan:
+                x0, y0 = enemigo.x, enemigo.y
+                if enemigo.mover_hacia_jugador(j, mapa.base_matriz, j.movimientos, linea_de_vision,
+                                               campo_flujo):
+                    mapa.enemigo_movido(enemigo, x0, y0)
+            mapa.reprogramar_enemigos(actuan, j.movimientos)
+
+        self.verificar_cofre(eventos)
+
+        if self.resolver_colisiones_enemigos(eventos):
+            self.terminada = True
+        elif self.historial is not None:
+            self.historial.registrar()
+
+        if self.verificar_portal():
+            eventos.append((PORTAL, self.nivel))
+            self.nivel += 1
+            j.corazones_totales += 1  # Añadir corazón vacío
+            j.recargar_corazones()    # Intentar recargar usando puntuación
+            eventos.extend(self.cambiar_mapa())
+        return eventos
+
+    def deshacer(self, turnos=1):
+        if self.historial is None or not self.historial.deshacer(turnos):
+            return [(DESHACER_TURNO, -1)]
+        return [(DESHACER_TURNO, len(self.historial))]
+
+    # ===================== Reglas =====================
+    def resolver_colisiones_enemigos(self, eventos):
+        """Resuelve los choques con enemigos; True si el jugador fue derrotado."""
+        j = self.mapa.jugador
+        colisionados = self.mapa.enemigos_en(j.x, j.y)
+        if not colisionados:
+            return False
+
+        for e in colisionados:
+            if j.espadas > 0:
+                j.espadas -= 1
+                self.mapa.eliminar_enemigo(e)
+                eventos.append((ESPADA,))
+                continue
+
+            if j.armaduras > 0:
+                j.armaduras -= 1
+                if self.empujar_enemigo(e, pasos=2):
+                    eventos.append((EMPUJON,))
+                else:
+                    j.perder_corazon()
+                    eventos.append((CORAZON, j.corazones_llenos, j.corazones_totales, True))
+                    if j.corazones_llenos == 0:
+                        eventos.append((DERROTA,))
+                        return True
+                continue
+
+            # Sin items: perder corazón
+            j.perder_corazon()
+            eventos.append((CORAZON, j.corazones_llenos, j.corazones_totales, False))
+            if j.corazones_llenos == 0:
+                eventos.append((DERROTA,))
+                return True
+
+        return False
+
+    def empujar_enemigo(self, enemigo, pasos=2):
+        dx = enemigo.ultimo_dx
+        dy = enemigo.ultimo_dy
+        if dx == 0 and dy == 0:
+            j = self.mapa.jugador
+            dx = 1 if enemigo.x > j.x else -1 if enemigo.x < j.x else 0
+            dy = 1 if enemigo.y > j.y else -1 if enemigo.y < j.y else 0
+        dx *= -1
+        dy *= -1
+        final_x, final_y = enemigo.x, enemigo.y
+        for step in range(1, pasos + 1):
+            nx = enemigo.x + dx * step
+            ny = enemigo.y + dy * step
+            if celda_transitable(self.mapa.base_matriz, nx, ny):
+                final_x, final_y = nx, ny
+            else:
+                break
+        if (final_x, final_y) != (enemigo.x, enemigo.y):
+            x0, y0 = enemigo.x, enemigo.y
+            enemigo.x, enemigo.y = final_x, final_y
+            self.mapa.enemigo_movido(enemigo, x0, y0)
+            return True
+        return False
+
+    def verificar_cofre(self, eventos):
+        j = self.mapa.jugador
+        c = self.mapa.cofre_en(j.x, j.y)
+        if c is None:
+            return False
+        self.mapa.abrir_cofre(c)
+        if c.codigo == OBJETO_ARMADURA:
+            j.armaduras += 1
+        elif c.codigo == OBJETO_ESPADA:
+            j.espadas += 1
+        elif c.codigo == OBJETO_DINERO:
+            j.puntuacion += c.valor
+        eventos.append((COFRE, c.contenido, c.valor, j.puntuacion))
+        return True
+
+    def verificar_portal(self):
+        j = self.mapa.jugador
+        px, py = self.mapa.portal
+        return j.x == px and j.y == py
+
+    # ===================== Partidas guardadas =====================
+    def guardar(self, ruta):
+        """Guarda la partida; lanza OSError/ValueError si no se puede."""
+        guardar_partida(ruta, self.mapa, self.nivel)
+
+    def cargar(self, ruta):
+        """Carga una partida guardada; devuelve los eventos.
+
+        Lanza OSError/ValueError si no se puede, sin tocar la partida actual.
+        """
+        nivel, mapa = cargar_partida(ruta)
+        if self.grabacion is not None:
+            # Lo que viene después depende del fichero cargado: no es reproducible
+            self.terminar_grabacion()
+        self.mapa.cerrar()
+        self.precarga.descartar()
+        self.nivel, self.mapa = nivel, mapa
+        self.terminada = False
+        if self.historial is not None:
+            self.historial.reiniciar(mapa)
+        self._precargar_siguiente()
+        return [(CARGADA, self.nivel)]
+
+    # ===================== Repeticiones =====================
+    def empezar_grabacion(self, ruta):
+        """Graba las acciones de la partida que empieza (antes de reiniciar())."""
+        if self.semilla is None:
+            # Sin semilla fija se elige una: la repetición necesita los mismos mapas
+            self.semilla = random.getrandbits(32)
+        self.grabacion = Grabacion(ruta, self.semilla, REPLAY_CHECKSUM_EVERY)
+
+    def terminar_grabacion(self):
+        if self.grabacion is not None:
+            self.grabacion.cerrar()
+            self.grabacion = None
+
+    def reproducir(self, ruta, al_avanzar=None):
+        """Reproduce una repetición desde el principio; devuelve las acciones jugadas.
+
+        `al_avanzar(eventos)` se llama tras cada acción (p. ej. para dibujar).
+        Lanza repeticion.Divergencia si el estado no coincide con la grabación.
+        """
+        repeticion = Repeticion(ruta)
+        self.semilla = repeticion.semilla
+        eventos = self.reiniciar()
+        if al_avanzar is not None:
+            al_avanzar(eventos)
+        acciones = 0
+        for nivel, accion, suma in repeticion.eventos():
+            if nivel != self.nivel:
+                raise Divergencia(f"Acción {acciones}: nivel {self.nivel}, la grabación dice {nivel}")
+            if accion == SUMA:
+                if suma_estado(self.nivel, self.mapa) != suma:
+                    raise Divergencia(f"Acción {acciones}: el estado no coincide con la grabación")
+                continue
+            acciones += 1
+            eventos = self.step(accion)
+            if al_avanzar is not None:
+                al_avanzar(eventos)
+            if self.terminada:
+                break
+        return acciones
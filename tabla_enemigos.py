@@ -0,0 +1,158 @@
+# Enemigos en columnas de NumPy para mover muchos a la vez.
+#
+# TablaEnemigos guarda x, y, vision, cadencia, ultimo_movimiento y ultimo_dx/dy de los
+# enemigos despiertos de un Mapa (Mapa.enemigos_despiertos) en arrays, un
+# hueco por enemigo, y aplica Enemigo.mover_hacia_jugador a todos en una
+# sola pasada vectorizada: prueba de visión, dirección del paso, consulta de
+# paso (máscara de terreno o campo de distancias) y movimiento. Sólo los que
+# se mueven vuelven a Python, para actualizar su Enemigo y el índice espacial.
+# Los dormidos no pueden ver al jugador, así que no hace falta mirarlos: el
+# coste de un turno depende de los despiertos, como en el camino uno a uno.
+#
+# Los Enemigo siguen siendo la fuente de verdad del resto del juego (dibujo,
+# historial, partidas guardadas); Mapa mantiene la tabla al día con
+# enemigo_movido() y la rehace cuando cambia la lista de despiertos.
+# Con pocos despiertos no compensa: ver ENEMY_TABLE_MIN.
+
+from entidades import DIRECCIONES
+from serializacion import codigos_terreno
+from terreno import GrillaTerreno, TABLA_PASO_NP, np
+
+_COLUMNAS = ('x', 'y', 'vision', 'cadencia', 'ultimo', 'udx', 'udy')
+
+
+class TablaEnemigos:
+    def __init__(self, mapa):
+        if np is None:
+            raise ImportError("TablaEnemigos requiere tener NumPy instalado")
+        self.mapa = mapa
+        self._lista = None   # lista de despiertos de la que salen las columnas
+        self._huecos = {}    # id(enemigo) -> hueco
+        self._paso = None    # máscara de terreno transitable
+
+    # ===================== Sincronización =====================
+    def invalidar(self):
+        """Los enemigos cambiaron: se rehace la tabla en el próximo uso."""
+        self._lista = None
+
+    def terreno_modificado(self):
+        self._paso = None
+
+    def enemigo_movido(self, enemigo):
+        """Copia a la tabla la posición y el último paso de `enemigo`."""
+        if self._lista is None:
+            return
+        i = self._huecos.get(id(enemigo))
+        if i is None:
+            self.invalidar()
+            return
+        self.x[i] = enemigo.x
+        self.y[i] = enemigo.y
+        self.ultimo[i] = enemigo.ultimo_movimiento
+        self.udx[i] = enemigo.ultimo_dx
+        self.udy[i] = enemigo.ultimo_dy
+
+    def _sincronizar(self):
+        enemigos = self.mapa.enemigos_despiertos()
+        if self._lista is enemigos:
+            return
+        datos = np.array([(e.x, e.y, e.vision, e.cadencia, e.ultimo_movimiento, e.ultimo_dx, e.ultimo_dy)
+                          for e in enemigos], dtype=np.int64).reshape(len(enemigos), len(_COLUMNAS))
+        for k, nombre in enumerate(_COLUMNAS):
+            setattr(self, nombre, datos[:, k].copy())
+        self._huecos = {id(e): i for i, e in enumerate(enemigos)}
+        self._lista = enemigos
+
+    def _mascara_paso(self):
+        if self._paso is None:
+            base = self.mapa.base_matriz
+            if isinstance(base, GrillaTerreno):
+                self._paso = base.mascara_transitable()
+            else:
+                codigos = np.frombuffer(codigos_terreno(base), dtype=np.uint8)
+                self._paso = TABLA_PASO_NP[codigos].reshape(self.mapa.filas, self.mapa.columnas)
+        return self._paso
+
+    # ===================== Reglas =====================
+    def perseguir(self, jugador, movimiento_actual, linea_de_vision=None, campo_flujo=None):
+        """Enemigo.mover_hacia_jugador para todos a la vez.
+
+        Devuelve [(enemigo, x0, y0)] de los que se movieron, ya actualizados.
+        """
+        self._sincronizar()
+        dist_x = jugador.x - self.x
+        dist_y = jugador.y - self.y
+        candidatos = np.flatnonzero((movimiento_actual - self.ultimo >= self.cadencia)
+                                    & (np.abs(dist_x) <= self.vision) & (np.abs(dist_y) <= self.vision))
+        if linea_de_vision is not None and len(candidatos):
+            ven = np.fromiter((linea_de_vision(x, y, jugador.x, jugador.y, v)
+                               for x, y, v in zip(self.x[candidatos].tolist(), self.y[candidatos].tolist(),
+                                                  self.vision[candidatos].tolist())),
+                              dtype=np.bool_, count=len(candidatos))
+            candidatos = candidatos[ven]
+        if not len(candidatos):
+            return []
+
+        x = self.x[candidatos]
+        y = self.y[candidatos]
+        cx = dist_x[candidatos]
+        cy = dist_y[candidatos]
+        por_x = np.abs(cx) > np.abs(cy)
+        dx = np.where(por_x, np.sign(cx), 0)
+        dy = np.where(por_x, 0, np.where(cy > 0, 1, -1))
+        if campo_flujo is None:
+            mueve = self._transitable(x + dx, y + dy)
+        else:
+            mueve, dx, dy = self._bajar_por_campo(campo_flujo, x, y, dx, dy)
+
+        huecos = candidatos[mueve]
+        dx = dx[mueve]
+        dy = dy[mueve]
+        x0 = self.x[huecos]
+        y0 = self.y[huecos]
+        self.x[huecos] = x0 + dx
+        self.y[huecos] = y0 + dy
+        self.ultimo[huecos] = movimiento_actual
+        self.udx[huecos] = dx
+        self.udy[huecos] = dy
+
+        enemigos = self._lista
+        movidos = []
+        for i, ax, ay, pdx, pdy in zip(huecos.tolist(), x0.tolist(), y0.tolist(), dx.tolist(), dy.tolist()):
+            e = enemigos[i]
+            e.x = ax + pdx
+            e.y = ay + pdy
+            e.ultimo_movimiento = movimiento_actual
+            e.ultimo_dx = pdx
+            e.ultimo_dy = pdy
+            movidos.append((e, ax, ay))
+        return movidos
+
+    # ===================== Internos =====================
+    def _transitable(self, x, y):
+        filas, columnas = self.mapa.filas, self.mapa.columnas
+        dentro = (x >= 0) & (x < filas) & (y >= 0) & (y < columnas)
+        return dentro & self._mascara_paso()[np.clip(x, 0, filas - 1), np.clip(y, 0, columnas - 1)]
+
+    def _bajar_por_campo(self, campo_flujo, x, y, dx, dy):
+        """Como Enemigo._bajar_por_campo: primero (dx, dy) y luego DIRECCIONES."""
+        ex, ey, dist = campo_flujo.ventana()
+        lado = campo_flujo.lado
+        dist = np.frombuffer(dist, dtype=np.intc).reshape(lado, lado)
+
+        def distancia(px, py):
+            lx = px - ex
+            ly = py - ey
+            dentro = (lx >= 0) & (lx < lado) & (ly >= 0) & (ly < lado)
+            return np.where(dentro, dist[np.clip(lx, 0, lado - 1), np.clip(ly, 0, lado - 1)], -1)
+
+        d0 = distancia(x, y)
+        pendiente = d0 > 0
+        px = np.zeros_like(dx)
+        py = np.zeros_like(dy)
+        for cdx, cdy in ((dx, dy),) + DIRECCIONES:
+            elige = pendiente & (distancia(x + cdx, y + cdy) == d0 - 1)
+            px = np.where(elige, cdx, px)
+            py = np.where(elige, cdy, py)
+            pendiente &= ~elige
+        return (d0 > 0) & ~pendiente, px, py
@@ -0,0 +1,120 @@
+# Representación del terreno del mapa.
+#
+# El mapa clásico es una lista de listas de caracteres (' ' muro, '.' suelo,
+# 'S' portal). Para mapas grandes existe un backend opcional con NumPy que
+# guarda un código uint8 por celda y resuelve el paso con una tabla.
+# GrillaTerreno se comporta como la lista de listas (base_matriz[x][y]),
+# así que el resto del juego no necesita saber qué backend se usa.
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él sólo existe el backend 'lista'
+    np = None
+
+# Códigos de terreno
+MURO = 0
+SUELO = 1
+PORTAL = 2
+
+CARACTERES = (' ', '.', 'S')                 # código -> carácter
+CODIGOS = {c: i for i, c in enumerate(CARACTERES)}  # carácter -> código
+CELDAS_TRANSITABLES = frozenset(('.', 'S'))
+
+# Tabla de paso indexada por código
+TABLA_PASO = (False, True, True)
+if np is not None:
+    TABLA_PASO_NP = np.array(TABLA_PASO, dtype=np.bool_)
+
+BACKENDS = ('lista', 'numpy')
+
+
+class _FilaTerreno:
+    """Vista de una fila de GrillaTerreno que lee y escribe caracteres."""
+    __slots__ = ('_codigos',)
+
+    def __init__(self, codigos):
+        self._codigos = codigos
+
+    def __len__(self):
+        return len(self._codigos)
+
+    def __getitem__(self, j):
+        return CARACTERES[self._codigos[j]]
+
+    def __setitem__(self, j, caracter):
+        self._codigos[j] = CODIGOS[caracter]
+
+    def __iter__(self):
+        for codigo in self._codigos.tolist():
+            yield CARACTERES[codigo]
+
+
+class GrillaTerreno:
+    """Terreno en una matriz uint8 de NumPy con acceso compatible con base_matriz."""
+
+    def __init__(self, filas, columnas):
+        if np is None:
+            raise ImportError("El backend de terreno 'numpy' requiere tener NumPy instalado")
+        self.filas = filas
+        self.columnas = columnas
+        self.codigos = np.zeros((filas, columnas), dtype=np.uint8)
+
+    @classmethod
+    def desde_codigos(cls, codigos):
+        """Envuelve una matriz uint8 existente (p. ej. una vista) sin copiarla."""
+        grilla = cls.__new__(cls)
+        grilla.filas, grilla.columnas = codigos.shape
+        grilla.codigos = codigos
+        return grilla
+
+    # --- Acceso estilo lista de listas ---
+    def __len__(self):
+        return self.filas
+
+    def __getitem__(self, i):
+        return _FilaTerreno(self.codigos[i])
+
+    def __iter__(self):
+        for i in range(self.filas):
+            yield _FilaTerreno(self.codigos[i])
+
+    # --- Operaciones rápidas ---
+    def transitable(self, x, y):
+        """Indica si (x, y) está dentro de la grilla y se puede pisar."""
+        if 0 <= x < self.filas and 0 <= y < self.columnas:
+            return TABLA_PASO[self.codigos[x, y]]
+        return False
+
+    def mascara_transitable(self):
+        """Matriz booleana con True en las celdas transitables."""
+        return TABLA_PASO_NP[self.codigos]
+
+    def rellenar_aleatorio(self, prob_suelo, rng):
+        """Rellena toda la grilla en un único sorteo vectorizado (suelo o muro)."""
+        sorteo = rng.random((self.filas, self.columnas), dtype=np.float32)
+        np.less(sorteo, prob_suelo, out=self.codigos, casting='unsafe')
+
+    def a_lista(self):
+        """Convierte la grilla a la lista de listas de caracteres clásica."""
+        return [[CARACTERES[c] for c in fila] for fila in self.codigos.tolist()]
+
+
+def crear_base_matriz(filas, columnas, backend='lista'):
+    """Crea la matriz de terreno vacía (todo muro) para el backend indicado."""
+    if backend == 'lista':
+        return [[' ' for _ in range(columnas)] for _ in range(filas)]
+    if backend == 'numpy':
+        return GrillaTerreno(filas, columnas)
+    raise ValueError(f"Backend de terreno desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+
+
+def celda_transitable(base_matriz, x, y):
+    """Indica si (x, y) está dentro del mapa y es suelo o portal.
+
+    Funciona con cualquiera de los dos backends de base_matriz.
+    """
+    if isinstance(base_matriz, GrillaTerreno):
+        return base_matriz.transitable(x, y)
+    if 0 <= x < len(base_matriz) and 0 <= y < len(base_matriz[0]):
+        return base_matriz[x][y] in CELDAS_TRANSITABLES
+    return False
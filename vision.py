@@ -0,0 +1,129 @@
+# Estenciles de visión precalculados.
+#
+# revelar_area usaba un doble bucle sobre la caja (2r+1)^2 en cada paso.
+# Aquí se precalcula, por radio, el disco de desplazamientos visibles y,
+# por (radio, dx, dy), la "media luna" de celdas que entran en el disco
+# al moverse una casilla. Ambos se cachean: sólo hay unos pocos radios.
+#
+# También incluye el campo de visión con línea de visión (sombras
+# simétricas), que respeta los muros, con su caché por posición y radio.
+
+from collections import OrderedDict
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def estencil_disco(radio):
+    """Desplazamientos (di, dj) con di^2 + dj^2 <= radio^2."""
+    r2 = radio * radio
+    return tuple((di, dj)
+                 for di in range(-radio, radio + 1)
+                 for dj in range(-radio, radio + 1)
+                 if di * di + dj * dj <= r2)
+
+
+@lru_cache(maxsize=None)
+def estencil_delta(radio, dx, dy):
+    """Desplazamientos del disco centrado en la nueva posición que no estaban
+    en el disco centrado en la posición anterior (nueva - (dx, dy)).
+    """
+    disco = estencil_disco(radio)
+    anterior = set(disco)
+    return tuple((di, dj) for di, dj in disco if (di + dx, dj + dy) not in anterior)
+
+
+def celdas_estencil(x, y, estencil, filas, columnas):
+    """Aplica un estencil en (x, y) descartando las celdas fuera del mapa."""
+    return [(x + di, y + dj) for di, dj in estencil
+            if 0 <= x + di < filas and 0 <= y + dj < columnas]
+
+
+# ===================== Campo de visión con sombras =====================
+# Sombras simétricas (symmetric shadowcasting) por cuadrantes: cada fila a
+# profundidad d se recorre entre una pendiente inicial y final; un muro
+# parte la fila y lanza la siguiente con el hueco de luz que queda. Las
+# pendientes son fracciones exactas (num, den) para evitar empates mal
+# redondeados, y se leen de una tabla precalculada por radio.
+
+# (dx por profundidad, dx por columna, dy por profundidad, dy por columna)
+_CUADRANTES = ((-1, 0, 0, 1), (1, 0, 0, 1), (0, 1, 1, 0), (0, 1, -1, 0))
+
+
+@lru_cache(maxsize=None)
+def tabla_pendientes(radio):
+    """Para cada profundidad d en 1..radio: (columna máxima dentro del radio,
+    pendientes (2c - 1, 2d) del borde de cada columna c, indexadas por c + d).
+    """
+    r2 = radio * radio
+    tabla = [None]
+    for d in range(1, radio + 1):
+        col_max = 0
+        while (col_max + 1) ** 2 + d * d <= r2:
+            col_max += 1
+        tabla.append((col_max, tuple((2 * c - 1, 2 * d) for c in range(-d, d + 1))))
+    return tuple(tabla)
+
+
+def sombras_simetricas(x, y, radio, es_opaca, filas, columnas):
+    """Conjunto de celdas visibles desde (x, y) dentro de `radio`.
+
+    es_opaca(x, y) debe devolver True para muros y para celdas fuera del mapa.
+    """
+    tabla = tabla_pendientes(radio)
+    visibles = {(x, y)}
+    for qd_x, qc_x, qd_y, qc_y in _CUADRANTES:
+        # Filas pendientes: (profundidad, pendiente inicial, pendiente final)
+        pila = [(1, -1, 1, 1, 1)]
+        while pila:
+            d, sn, sd, en, ed = pila.pop()
+            if d > radio:
+                continue
+            col_max, pendientes = tabla[d]
+            min_col = (2 * d * sn + sd) // (2 * sd)        # redondeo con empates hacia arriba
+            max_col = -((ed - 2 * d * en) // (2 * ed))     # redondeo con empates hacia abajo
+            anterior = None  # None: sin celda previa, True: muro, False: suelo
+            for col in range(min_col, max_col + 1):
+                cx = x + d * qd_x + col * qc_x
+                cy = y + d * qd_y + col * qc_y
+                opaca = es_opaca(cx, cy)
+                if -col_max <= col <= col_max and 0 <= cx < filas and 0 <= cy < columnas:
+                    if opaca or (col * sd >= d * sn and col * ed <= d * en):
+                        visibles.add((cx, cy))
+                if anterior is True and not opaca:
+                    sn, sd = pendientes[col + d]
+                elif anterior is False and opaca:
+                    en_sig, ed_sig = pendientes[col + d]
+                    pila.append((d + 1, sn, sd, en_sig, ed_sig))
+                anterior = opaca
+            if anterior is False:
+                pila.append((d + 1, sn, sd, en, ed))
+    return visibles
+
+
+class CampoVision:
+    """Caché LRU de conjuntos visibles por (posición, radio).
+
+    Debe invalidarse cuando cambia el terreno (Mapa.terreno_modificado).
+    """
+
+    def __init__(self, es_opaca, filas, columnas, capacidad=4096):
+        self.es_opaca = es_opaca
+        self.filas = filas
+        self.columnas = columnas
+        self.capacidad = capacidad
+        self._cache = OrderedDict()
+
+    def visibles(self, x, y, radio):
+        clave = (x, y, radio)
+        visibles = self._cache.get(clave)
+        if visibles is not None:
+            self._cache.move_to_end(clave)
+            return visibles
+        visibles = frozenset(sombras_simetricas(x, y, radio, self.es_opaca, self.filas, self.columnas))
+        self._cache[clave] = visibles
+        if len(self._cache) > self.capacidad:
+            self._cache.popitem(last=False)
+        return visibles
+
+    def invalidar(self):
+        self._cache.clear()